@@ -0,0 +1,344 @@
+"""Local HTTP API that generates AQL queries without the Streamlit UI.
+
+Endpoints:
+    POST /query    raw workbook or CSV export as the body (pass its name as
+                   ``?file_name=`` so the reader and CSV type can be chosen),
+                   or a JSON object ``{"monitoring_type": "PO_Ordering",
+                   "unique_names": [...]}``. Returns the queries, the Info
+                   metadata and the rejected IDs as JSON.
+    GET  /stats    request counts, throughput and latency percentiles
+    GET  /health   liveness check
+
+Both kinds of ``/query`` accept ``max_ids``, ``max_bytes`` and ``compact``,
+as query parameters or JSON fields, with the same meaning as in batch_cli.
+Malformed requests are answered with 400 and uploads that cannot be read as
+a report with 422; 500 is left for faults of the server itself.
+
+Connections are accepted on the main thread and wait in a bounded queue for
+a fixed set of worker threads; when the queue is full the request is
+answered with 503 right away. Workbooks are parsed in a process pool of the
+same size, so parses use every core instead of contending for the GIL.
+
+Usage:
+    python api_server.py [--host 127.0.0.1] [--port 8502] [--workers 4] [--queue-size 64]
+    curl --data-binary @report.xlsx "http://127.0.0.1:8502/query?file_name=report.xlsx"
+"""
+
+import argparse
+import collections
+import http.server
+import json
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+import traceback
+import urllib.parse
+from concurrent.futures import ProcessPoolExecutor
+
+from processing import (
+    QUERY_BATCH_MAX_BYTES,
+    QUERY_BATCH_MAX_IDS,
+    QUERY_BUILDERS,
+    REPORT_READ_ERRORS,
+    build_batched_queries,
+    normalize_unique_names,
+    open_report,
+)
+
+
+API_HOST = os.environ.get("POM_API_HOST", "127.0.0.1")
+API_PORT = int(os.environ.get("POM_API_PORT", "8502"))
+API_WORKERS = int(os.environ.get("POM_API_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Requests waiting for a worker beyond this are turned away with 503
+API_QUEUE_SIZE = int(os.environ.get("POM_API_QUEUE_SIZE", "64"))
+API_MAX_UPLOAD_MB = int(os.environ.get("POM_API_MAX_UPLOAD_MB", "200"))
+
+# Completed requests kept for the latency percentiles and recent throughput
+LATENCY_WINDOW = 10000
+RECENT_SECONDS = 60
+
+
+class ApiError(Exception):
+    """A request that cannot be served, answered with ``status`` and the message."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_report(file_bytes: bytes, file_name: str) -> dict:
+    """Read the type, Info and normalized IDs of an uploaded report; runs in worker processes."""
+    workbook = open_report(file_bytes, file_name)
+    result = {
+        "monitoring_type": workbook.monitoring_type,
+        "info": workbook.info,
+        "query_ids": None,
+        "rejected": [],
+    }
+    if workbook.monitoring_type is not None and workbook.query_ids is not None:
+        result["query_ids"] = workbook.query_ids
+        result["rejected"] = workbook.rejected_ids.to_dict("records")
+    return result
+
+
+def percentile(sorted_values: list, share: float) -> float:
+    """Nearest-rank percentile of an already sorted list (0 when empty)."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(share * len(sorted_values)))]
+
+
+class ServiceStats:
+    """Request counters and recent latencies, updated from the worker threads."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._lock = threading.Lock()
+        self.started = time.monotonic()
+        self.completed = 0
+        self.client_errors = 0
+        self.server_errors = 0
+        self.rejected = 0
+        self.busy = 0
+        # (finished_at, queue wait, service time) of the latest requests
+        self._recent = collections.deque(maxlen=window)
+
+    def start(self):
+        with self._lock:
+            self.busy += 1
+
+    def finish(self, status: int, wait_seconds: float, service_seconds: float):
+        with self._lock:
+            self.busy -= 1
+            self.completed += 1
+            if 400 <= status < 500:
+                self.client_errors += 1
+            elif status >= 500:
+                self.server_errors += 1
+            self._recent.append((time.monotonic(), wait_seconds, service_seconds))
+
+    def reject(self):
+        with self._lock:
+            self.rejected += 1
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            recent = list(self._recent)
+            counts = {
+                "completed": self.completed,
+                "client_errors": self.client_errors,
+                "server_errors": self.server_errors,
+                "rejected": self.rejected,
+                "busy_workers": self.busy,
+            }
+        uptime = now - self.started
+        latencies = sorted(wait + service for _, wait, service in recent)
+        waits = sorted(wait for _, wait, _ in recent)
+        recent_count = sum(1 for finished, _, _ in recent if finished >= now - RECENT_SECONDS)
+        to_ms = lambda seconds: round(seconds * 1000, 2)  # noqa: E731
+        return {
+            "uptime_s": round(uptime, 1),
+            **counts,
+            "throughput_rps": round(counts["completed"] / uptime, 2) if uptime else 0.0,
+            "recent_rps": round(recent_count / min(uptime, RECENT_SECONDS), 2) if uptime else 0.0,
+            "latency_ms": {
+                "p50": to_ms(percentile(latencies, 0.50)),
+                "p95": to_ms(percentile(latencies, 0.95)),
+                "p99": to_ms(percentile(latencies, 0.99)),
+                "max": to_ms(latencies[-1] if latencies else 0.0),
+            },
+            "queue_wait_ms": {
+                "p50": to_ms(percentile(waits, 0.50)),
+                "p95": to_ms(percentile(waits, 0.95)),
+            },
+            "window": len(recent),
+        }
+
+
+class QueuedHTTPServer(http.server.HTTPServer):
+    """HTTP server whose connections wait in a bounded queue for a fixed pool of threads."""
+
+    def __init__(self, address, handler_class, workers: int = API_WORKERS, queue_size: int = API_QUEUE_SIZE):
+        # The listen backlog must hold a burst of clients until they are queued
+        self.request_queue_size = max(queue_size, 5)
+        super().__init__(address, handler_class)
+        self.stats = ServiceStats()
+        self.worker_count = workers
+        self.pending = queue.Queue(maxsize=queue_size)
+        self.parse_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        self._threads = [
+            threading.Thread(target=self._work, name=f"pom-api-{i}", daemon=True) for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def process_request(self, request, client_address):
+        try:
+            self.pending.put_nowait((request, client_address, time.perf_counter()))
+        except queue.Full:
+            self.stats.reject()
+            body = json.dumps({"error": "Server busy, retry later"}).encode("utf-8")
+            try:
+                request.sendall(
+                    b"HTTP/1.0 503 Service Unavailable\r\nContent-Type: application/json\r\n"
+                    b"Retry-After: 1\r\nContent-Length: " + str(len(body)).encode("ascii") + b"\r\n\r\n" + body
+                )
+            except OSError:
+                pass
+            self.shutdown_request(request)
+
+    def _work(self):
+        while True:
+            item = self.pending.get()
+            if item is None:
+                return
+            request, client_address, queued_at = item
+            started = time.perf_counter()
+            self.stats.start()
+            status = 500
+            try:
+                status = self.RequestHandlerClass(request, client_address, self).status
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+                self.stats.finish(status, started - queued_at, time.perf_counter() - started)
+
+    def server_close(self):
+        for _ in self._threads:
+            self.pending.put(None)
+        for thread in self._threads:
+            thread.join()
+        self.parse_pool.shutdown(cancel_futures=True)
+        super().server_close()
+
+
+class ApiHandler(http.server.BaseHTTPRequestHandler):
+    server_version = "POMQueryAPI/1.0"
+    status = 500
+
+    def send_response(self, code, message=None):
+        self.status = code
+        super().send_response(code, message)
+
+    def log_message(self, format, *args):
+        # Per-request lines would swamp the console under load; /stats has the numbers
+        pass
+
+    def send_json(self, status: int, payload: dict):
+        body = json.dumps(payload, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = urllib.parse.urlsplit(self.path).path
+        if path == "/health":
+            self.send_json(200, {"status": "ok"})
+        elif path == "/stats":
+            self.send_json(200, {
+                **self.server.stats.snapshot(),
+                "workers": self.server.worker_count,
+                "queue_depth": self.server.pending.qsize(),
+                "queue_size": self.server.pending.maxsize,
+            })
+        else:
+            self.send_json(404, {"error": f"Unknown path {path}"})
+
+    def do_POST(self):
+        url = urllib.parse.urlsplit(self.path)
+        if url.path != "/query":
+            self.send_json(404, {"error": f"Unknown path {url.path}"})
+            return
+        try:
+            self.send_json(200, self.handle_query(dict(urllib.parse.parse_qsl(url.query))))
+        except ApiError as e:
+            self.send_json(e.status, {"error": str(e)})
+        except Exception:
+            # A fault of the server, not of the request; the details go to its log
+            traceback.print_exc()
+            self.send_json(500, {"error": "Internal server error"})
+
+    def read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        if length <= 0:
+            raise ApiError(400, "Empty request body")
+        if length > API_MAX_UPLOAD_MB * 1024 * 1024:
+            raise ApiError(413, f"Request body is larger than {API_MAX_UPLOAD_MB} MB")
+        return self.rfile.read(length)
+
+    def handle_query(self, params: dict) -> dict:
+        body = self.read_body()
+        if self.headers.get_content_type() == "application/json":
+            try:
+                params.update(json.loads(body))
+            except (ValueError, TypeError):
+                raise ApiError(400, "Body is not a JSON object")
+            monitoring_type = params.get("monitoring_type")
+            unique_names = params.get("unique_names")
+            if monitoring_type not in QUERY_BUILDERS:
+                raise ApiError(400, f"monitoring_type must be one of {sorted(QUERY_BUILDERS)}")
+            if not isinstance(unique_names, list):
+                raise ApiError(400, "unique_names must be a list")
+            query_ids, rejected = normalize_unique_names(unique_names, monitoring_type)
+            report = {"monitoring_type": monitoring_type, "info": {}, "query_ids": query_ids,
+                      "rejected": rejected.to_dict("records")}
+        else:
+            file_name = params.get("file_name") or self.headers.get("X-File-Name") or "report.xlsx"
+            try:
+                report = self.server.parse_pool.submit(parse_report, body, file_name).result()
+            except REPORT_READ_ERRORS as e:
+                raise ApiError(422, f"Could not read {file_name} as a report: {type(e).__name__}: {e}")
+            monitoring_type = report["monitoring_type"]
+            if monitoring_type is None:
+                raise ApiError(422, "Could not detect the monitoring type of the uploaded file")
+            if monitoring_type not in QUERY_BUILDERS:
+                raise ApiError(422, f"No AQL query support for {monitoring_type}")
+            if report["query_ids"] is None:
+                raise ApiError(422, "The data sheet has no UniqueName column")
+
+        try:
+            max_ids = int(params.get("max_ids", QUERY_BATCH_MAX_IDS))
+            max_bytes = int(params.get("max_bytes", QUERY_BATCH_MAX_BYTES))
+        except (TypeError, ValueError):
+            raise ApiError(400, "max_ids and max_bytes must be integers")
+        compact = str(params.get("compact", "")).lower() in ("1", "true", "yes")
+
+        queries = build_batched_queries(monitoring_type, report["query_ids"], max_ids, max_bytes, compact)
+        return {
+            "monitoring_type": monitoring_type,
+            "info": report["info"],
+            "id_count": len(report["query_ids"]),
+            "rejected": report["rejected"],
+            "batch_count": len(queries),
+            "queries": queries,
+        }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Serve AQL query generation over local HTTP.")
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    parser.add_argument("--workers", type=int, default=API_WORKERS, help="Worker threads and parse processes")
+    parser.add_argument("--queue-size", type=int, default=API_QUEUE_SIZE, help="Requests that may wait for a worker")
+    args = parser.parse_args(argv)
+
+    server = QueuedHTTPServer((args.host, args.port), ApiHandler, args.workers, args.queue_size)
+    print(f"Serving on http://{args.host}:{server.server_port} "
+          f"({args.workers} workers, queue of {args.queue_size})", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
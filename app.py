@@ -1,8 +1,80 @@
+from __future__ import annotations
+
 import streamlit as st
-import pandas as pd
 import base64
+import collections
+import io
+import itertools
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import zipfile
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from pathlib import Path
-from typing import Tuple, Optional
+from typing import TYPE_CHECKING, Optional
+
+from diagnostics import StageRecorder
+from id_history import HISTORY_ENABLED, IdHistory
+from snapshots import SnapshotStore
+
+# processing pulls in pandas and openpyxl, which the landing page does not
+# need; functions import it on first use so the empty state paints without it
+if TYPE_CHECKING:
+    from processing import LazyWorkbook, ParseProgress
+
+
+# Parsed workbooks are cached per server process and shared by all sessions.
+WORKBOOK_CACHE_MAX_ENTRIES = int(os.environ.get("POM_WORKBOOK_CACHE_MAX_ENTRIES", "32"))
+WORKBOOK_CACHE_TTL_SECONDS = int(os.environ.get("POM_WORKBOOK_CACHE_TTL_SECONDS", "3600"))
+# Memory all cached workbooks may hold together; 0 disables the limit
+WORKBOOK_CACHE_MAX_MB = int(os.environ.get("POM_WORKBOOK_CACHE_MAX_MB", "1024"))
+PARSE_POOL_WORKERS = int(os.environ.get("POM_PARSE_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Threads reading single uploads in the background, and how often the page
+# refreshes their progress
+LOAD_POOL_WORKERS = int(os.environ.get("POM_LOAD_POOL_WORKERS", "8"))
+PROGRESS_POLL_SECONDS = 0.2
+
+# Queries larger than this are offered as a download instead of rendered inline
+QUERY_INLINE_MAX_BYTES = int(os.environ.get("POM_QUERY_INLINE_MAX_BYTES", str(256 * 1024)))
+QUERY_PREVIEW_CHARS = 4000
+
+# Range compaction of consecutive IDs starts on
+QUERY_COMPACT_DEFAULT = os.environ.get("POM_QUERY_COMPACT", "0") == "1"
+
+PREVIEW_PAGE_SIZES = [50, 100, 250, 1000]
+
+# Per-stage timing and memory panel; also enabled per page with ?diagnostics=1
+DIAGNOSTICS_ENABLED = os.environ.get("POM_DIAGNOSTICS", "0") == "1"
+DISABLED_RECORDER = StageRecorder(enabled=False)
+
+# How long the Summary waits for the ID history before showing a placeholder,
+# and how long the end of the page then waits to fill it in
+HISTORY_WAIT_SECONDS = 0.25
+HISTORY_FINAL_WAIT_SECONDS = 30
+
+# Incremental mode (query only IDs new since the previous report) starts on
+INCREMENTAL_MODE_DEFAULT = os.environ.get("POM_INCREMENTAL_MODE", "0") == "1"
+
+# Memory one session's reports may hold; 0 disables the check. Loading the raw
+# data is estimated at RAW_DATA_MEMORY_FACTOR times the file size.
+SESSION_MEMORY_BUDGET_MB = int(os.environ.get("POM_SESSION_MEMORY_BUDGET_MB", "512"))
+RAW_DATA_MEMORY_FACTOR = 3
+
+# Tiles per Summary breakdown; values beyond the first ones are added up as "Other"
+SUMMARY_MAX_TILES = 4
+
+# Report Information tiles: (label, info field, shown as N/A when missing)
+INFO_TILES = [
+    ("Realm", "realm", True),
+    ("Product Specialist", "product_specialist", True),
+    ("Data Center", "data_center", True),
+    ("Customer", "customer_name", False),
+    ("Realms", "realms", False),
+]
 
 
 def get_base64_image(image_path: str) -> str:
@@ -24,580 +96,46 @@ st.set_page_config(
 # Strict adherence to SAP Fiori Design Guidelines
 # ============================================================================
 
-FIORI_HORIZON_CSS = """
-<style>
-    /* ========================================
-       SAP FIORI HORIZON DESIGN TOKENS
-       ======================================== */
-    :root {
-        /* Brand & Primary Colors */
-        --sapBrandColor: #0070F2;
-        --sapPrimaryColor: #0070F2;
-        --sapSecondaryColor: #0040B0;
-        
-        /* Backgrounds */
-        --sapBackgroundColor: #F5F6F7;
-        --sapShellColor: #354A5F;
-        --sapSurfaceColor: #FFFFFF;
-        
-        /* Text */
-        --sapTextColor: #32363A;
-        --sapContent_LabelColor: #6A6D70;
-        --sapTitleColor: #32363A;
-        --sapShell_TextColor: #FFFFFF;
-        
-        /* Semantic Colors */
-        --sapNegativeColor: #BB0000;
-        --sapCriticalColor: #E9730C;
-        --sapPositiveColor: #107E3E;
-        --sapInformationColor: #0070F2;
-        --sapNeutralColor: #6A6D70;
-        
-        /* Components */
-        --sapButton_Background: #0070F2;
-        --sapButton_Hover_Background: #0064D9;
-        --sapButton_Active_Background: #0058C0;
-        --sapButton_TextColor: #FFFFFF;
-        --sapButton_BorderRadius: 8px;
-        --sapField_BorderColor: #89919A;
-        --sapField_Hover_BorderColor: #0070F2;
-        --sapField_Focus_BorderColor: #0070F2;
-        --sapField_Background: #FFFFFF;
-        
-        /* Cards */
-        --sapTile_Background: #FFFFFF;
-        --sapTile_BorderRadius: 12px;
-        --sapTile_BoxShadow: 0 0 2px rgba(0,0,0,0.1), 0 2px 8px rgba(0,0,0,0.1);
-        
-        /* Spacing & Layout */
-        --sapContentPadding: 1rem;
-        --sapElementGridSpacing: 0.5rem;
-        --sapContent_MaxWidth: 1200px;
-        
-        /* Shell */
-        --sapShell_Height: 48px;
-    }
-
-    /* ========================================
-       TYPOGRAPHY - SAP 72 Font Stack
-       ======================================== */
-    * {
-        font-family: "72", "72full", "72-Web", Helvetica, Arial, sans-serif;
-    }
-    
-    /* ========================================
-       GLOBAL RESET & APP BACKGROUND
-       ======================================== */
-    .stApp {
-        background-color: var(--sapBackgroundColor) !important;
-    }
-    
-    /* Hide Streamlit default elements */
-    #MainMenu, footer, header, 
-    .stApp > header,
-    [data-testid="stHeader"],
-    [data-testid="stToolbar"],
-    [data-testid="stDecoration"] {
-        display: none !important;
-        visibility: hidden !important;
-    }
-    
-    .block-container {
-        padding-top: 0 !important;
-        max-width: 100% !important;
-    }
-
-    /* ========================================
-       SHELL BAR (Fixed Header)
-       ======================================== */
-    .fiori-shell {
-        position: fixed;
-        top: 0;
-        left: 0;
-        right: 0;
-        height: var(--sapShell_Height);
-        background-color: var(--sapShellColor);
-        display: flex;
-        align-items: center;
-        justify-content: space-between;
-        padding: 0 1rem;
-        z-index: 9999;
-        box-shadow: 0 2px 4px rgba(0,0,0,0.15);
-    }
-    
-    .shell-logo {
-        display: flex;
-        align-items: center;
-    }
-    
-    .sap-logo {
-        height: 40px;
-        width: auto;
-    }
-    
-    .shell-title {
-        color: var(--sapShell_TextColor);
-        font-size: 1rem;
-        font-weight: 400;
-        position: absolute;
-        left: 50%;
-        transform: translateX(-50%);
-    }
-    
-    .shell-user {
-        display: flex;
-        align-items: center;
-        gap: 8px;
-    }
-    
-    .shell-avatar {
-        width: 32px;
-        height: 32px;
-        background-color: #5A7A94;
-        border-radius: 50%;
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        color: var(--sapShell_TextColor);
-        font-size: 0.85rem;
-        font-weight: 600;
-    }
-
-    /* ========================================
-       MAIN CONTENT CONTAINER
-       ======================================== */
-    .fiori-content {
-        margin-top: calc(var(--sapShell_Height) + 1rem);
-        max-width: var(--sapContent_MaxWidth);
-        margin-left: auto;
-        margin-right: auto;
-        padding: 0 1.5rem 4rem 1.5rem;
-    }
-
-    /* ========================================
-       PAGE HEADER
-       ======================================== */
-    .fiori-page-header {
-        margin-bottom: 1.5rem;
-    }
-    
-    .fiori-page-title {
-        font-size: 1.75rem;
-        font-weight: 700;
-        color: var(--sapTitleColor);
-        margin: 0 0 0.25rem 0;
-    }
-    
-    .fiori-page-subtitle {
-        font-size: 0.9375rem;
-        color: var(--sapContent_LabelColor);
-        margin: 0;
-    }
-
-    /* ========================================
-       CARDS (Fiori Tiles)
-       ======================================== */
-    .fiori-card {
-        background: var(--sapTile_Background);
-        border-radius: var(--sapTile_BorderRadius);
-        box-shadow: var(--sapTile_BoxShadow);
-        padding: var(--sapContentPadding);
-        margin-bottom: 1rem;
-    }
-    
-    .fiori-card-header {
-        border-bottom: 1px solid #E5E5E5;
-        padding-bottom: 0.75rem;
-        margin-bottom: 1rem;
-    }
-    
-    .fiori-card-title {
-        font-size: 1rem;
-        font-weight: 600;
-        color: var(--sapTitleColor);
-        margin: 0;
-    }
-    
-    .fiori-card-subtitle {
-        font-size: 0.8125rem;
-        color: var(--sapContent_LabelColor);
-        margin: 0.25rem 0 0 0;
-    }
-
-    /* ========================================
-       INFO TILES (Key-Value Display)
-       ======================================== */
-    .fiori-info-tile {
-        background: var(--sapSurfaceColor);
-        border-radius: var(--sapTile_BorderRadius);
-        box-shadow: var(--sapTile_BoxShadow);
-        padding: 1rem 1.25rem;
-        height: 100%;
-    }
-    
-    .fiori-info-label {
-        font-size: 0.75rem;
-        font-weight: 500;
-        color: var(--sapContent_LabelColor);
-        text-transform: uppercase;
-        letter-spacing: 0.05em;
-        margin-bottom: 0.5rem;
-    }
-    
-    
-    .fiori-info-value {
-        font-size: 1rem;
-        font-weight: 600;
-        color: var(--sapTextColor);
-        word-break: break-word;
-    }
-
-    /* ========================================
-       NUMERIC TILES (KPIs)
-       ======================================== */
-    .fiori-numeric-tile {
-        background: var(--sapSurfaceColor);
-        border-radius: var(--sapTile_BorderRadius);
-        box-shadow: var(--sapTile_BoxShadow);
-        padding: 1.25rem;
-        text-align: center;
-    }
-    
-    .fiori-numeric-value {
-        font-size: 2.5rem;
-        font-weight: 700;
-        color: var(--sapBrandColor);
-        line-height: 1.1;
-    }
-    
-    .fiori-numeric-label {
-        font-size: 0.8125rem;
-        font-weight: 500;
-        color: var(--sapContent_LabelColor);
-        margin-top: 0.5rem;
-        text-transform: uppercase;
-        letter-spacing: 0.03em;
-    }
-
-    /* ========================================
-       OBJECT STATUS / BADGES
-       ======================================== */
-    .fiori-status {
-        display: inline-flex;
-        align-items: center;
-        gap: 6px;
-        padding: 0.375rem 0.75rem;
-        border-radius: 6px;
-        font-size: 0.8125rem;
-        font-weight: 600;
-    }
-    
-    .fiori-status-info {
-        background-color: rgba(0, 112, 242, 0.12);
-        color: var(--sapInformationColor);
-    }
-    
-    .fiori-status-success {
-        background-color: rgba(16, 126, 62, 0.12);
-        color: var(--sapPositiveColor);
-    }
-    
-    .fiori-status-warning {
-        background-color: rgba(233, 115, 12, 0.12);
-        color: var(--sapCriticalColor);
-    }
-    
-    .fiori-status-error {
-        background-color: rgba(187, 0, 0, 0.12);
-        color: var(--sapNegativeColor);
-    }
-
-    /* ========================================
-       CODE DISPLAY (AQL Query)
-       ======================================== */
-    .fiori-code-card {
-        background: var(--sapSurfaceColor);
-        border-radius: var(--sapTile_BorderRadius);
-        box-shadow: var(--sapTile_BoxShadow);
-        overflow: hidden;
-    }
-    
-    .fiori-code-header {
-        background: #F5F6F7;
-        padding: 0.75rem 1rem;
-        border-bottom: 1px solid #E5E5E5;
-        display: flex;
-        align-items: center;
-        justify-content: space-between;
-    }
-    
-    .fiori-code-title {
-        font-size: 0.875rem;
-        font-weight: 600;
-        color: var(--sapTitleColor);
-        margin: 0;
-    }
-    
-    .fiori-code-body {
-        padding: 1rem;
-        background: #FAFBFC;
-        font-family: "Consolas", "Monaco", "Courier New", monospace;
-        font-size: 0.8125rem;
-        color: var(--sapTextColor);
-        line-height: 1.6;
-        overflow-x: auto;
-        white-space: pre-wrap;
-        max-height: 400px;
-        overflow-y: auto;
-    }
-
-    /* ========================================
-       BUTTONS
-       ======================================== */
-    .stButton > button {
-        background-color: var(--sapButton_Background) !important;
-        color: var(--sapButton_TextColor) !important;
-        border: none !important;
-        border-radius: var(--sapButton_BorderRadius) !important;
-        padding: 0.5rem 1rem !important;
-        font-weight: 600 !important;
-        font-size: 0.875rem !important;
-        transition: background-color 0.15s ease !important;
-        box-shadow: none !important;
-    }
-    
-    .stButton > button:hover {
-        background-color: var(--sapButton_Hover_Background) !important;
-        transform: none !important;
-        box-shadow: none !important;
-    }
-    
-    .stButton > button:active {
-        background-color: var(--sapButton_Active_Background) !important;
-    }
-    
-    /* Secondary button style */
-    .fiori-btn-secondary {
-        background-color: transparent !important;
-        color: var(--sapBrandColor) !important;
-        border: 1px solid var(--sapBrandColor) !important;
-    }
-    
-    .fiori-btn-secondary:hover {
-        background-color: rgba(0, 112, 242, 0.06) !important;
-    }
-
-    /* ========================================
-       FILE UPLOADER
-       ======================================== */
-    .fiori-upload-card {
-        background: var(--sapSurfaceColor);
-        border-radius: var(--sapTile_BorderRadius);
-        box-shadow: var(--sapTile_BoxShadow);
-        padding: 2rem;
-    }
-    
-    [data-testid="stFileUploader"] {
-        background: transparent;
-    }
-    
-    [data-testid="stFileUploader"] > div {
-        background: transparent !important;
-    }
-    
-    [data-testid="stFileUploader"] section {
-        background: var(--sapSurfaceColor) !important;
-        border: 2px dashed var(--sapField_BorderColor) !important;
-        border-radius: 8px !important;
-        padding: 2rem !important;
-    }
-    
-    [data-testid="stFileUploader"] section:hover {
-        border-color: var(--sapBrandColor) !important;
-        background: rgba(0, 112, 242, 0.02) !important;
-    }
-
-    /* ========================================
-       SECTION HEADERS
-       ======================================== */
-    .fiori-section-header {
-        font-size: 1rem;
-        font-weight: 600;
-        color: var(--sapTitleColor);
-        margin: 1.5rem 0 1rem 0;
-        padding-bottom: 0.5rem;
-        border-bottom: 1px solid #E5E5E5;
-    }
-    
-    /* Override Streamlit h3 */
-    h3 {
-        font-size: 1rem !important;
-        font-weight: 600 !important;
-        color: var(--sapTitleColor) !important;
-        margin: 1.5rem 0 1rem 0 !important;
-        padding-bottom: 0.5rem !important;
-        border-bottom: 1px solid #E5E5E5 !important;
-    }
-
-    /* ========================================
-       CONTACT LIST
-       ======================================== */
-    .fiori-contact-list {
-        display: flex;
-        flex-wrap: wrap;
-        gap: 0.5rem;
-    }
-    
-    .fiori-contact-chip {
-        display: inline-flex;
-        align-items: center;
-        background: #F0F1F2;
-        border-radius: 16px;
-        padding: 0.375rem 0.75rem;
-        font-size: 0.8125rem;
-        color: var(--sapTextColor);
-    }
+STATIC_DIR = Path(__file__).parent / "static"
+THEME_CSS_FILE = "fiori_horizon.css"
+LOGO_FILE = "saplogo.png"
 
 
-    /* ========================================
-       EMPTY STATE
-       ======================================== */
-    .fiori-empty-state {
-        background: var(--sapSurfaceColor);
-        border-radius: var(--sapTile_BorderRadius);
-        box-shadow: var(--sapTile_BoxShadow);
-        padding: 4rem 2rem;
-        text-align: center;
-    }
-    
-    .fiori-empty-icon {
-        width: 64px;
-        height: 64px;
-        background: linear-gradient(135deg, #E8F4FD 0%, #D6E9FA 100%);
-        border-radius: 50%;
-        margin: 0 auto 1.5rem;
-        display: flex;
-        align-items: center;
-        justify-content: center;
-    }
-    
-    .fiori-empty-icon svg {
-        width: 28px;
-        height: 28px;
-        color: var(--sapBrandColor);
-    }
-    
-    .fiori-empty-title {
-        font-size: 1.125rem;
-        font-weight: 600;
-        color: var(--sapTitleColor);
-        margin: 0 0 0.5rem 0;
-    }
-    
-    .fiori-empty-text {
-        font-size: 0.875rem;
-        color: var(--sapContent_LabelColor);
-        margin: 0;
-    }
-
-    /* ========================================
-       EXPANDER / ACCORDION
-       ======================================== */
-    .streamlit-expanderHeader {
-        background: var(--sapSurfaceColor) !important;
-        border: 1px solid #E5E5E5 !important;
-        border-radius: 8px !important;
-        color: var(--sapTextColor) !important;
-        font-weight: 600 !important;
-    }
-    
-    .streamlit-expanderContent {
-        border: 1px solid #E5E5E5 !important;
-        border-top: none !important;
-        border-radius: 0 0 8px 8px !important;
-    }
+def static_url(file_name: str) -> str:
+    """URL under which Streamlit serves a file from ``static/``."""
+    return f"app/static/{file_name}"
 
-    /* ========================================
-       DATA TABLE
-       ======================================== */
-    .stDataFrame {
-        border-radius: 8px !important;
-        overflow: hidden;
-        box-shadow: var(--sapTile_BoxShadow);
-    }
-    
-    [data-testid="stDataFrame"] > div {
-        border-radius: 8px;
-        overflow: hidden;
-    }
 
-    /* ========================================
-       CODE BLOCK (Streamlit native)
-       ======================================== */
-    .stCodeBlock {
-        border-radius: 8px !important;
-        border: 1px solid #E5E5E5 !important;
-    }
+@st.cache_resource(show_spinner=False)
+def get_theme_css_html() -> str:
+    """Return the theme as an inline ``<style>`` block, read from disk once per process.
     
-    pre {
-        background: #FAFBFC !important;
-        border-radius: 8px !important;
-    }
+    The stylesheet is not linked from ``app/static``: most Streamlit releases
+    that requirements.txt allows serve ``.css`` from there as ``text/plain``
+    with ``nosniff``, and browsers would drop the theme. The script is re-executed on every rerun,
+    which is why this uses Streamlit's cache rather than ``functools``.
+    """
+    css = (STATIC_DIR / THEME_CSS_FILE).read_text(encoding="utf-8")
+    return f"<style>\n{css}</style>"
 
-    /* ========================================
-       GRID LAYOUT HELPERS
-       ======================================== */
-    .fiori-grid-3 {
-        display: grid;
-        grid-template-columns: repeat(3, 1fr);
-        gap: 1rem;
-    }
-    
-    .fiori-grid-2 {
-        display: grid;
-        grid-template-columns: repeat(2, 1fr);
-        gap: 1rem;
-    }
-    
-    @media (max-width: 768px) {
-        .fiori-grid-3, .fiori-grid-2 {
-            grid-template-columns: 1fr;
-        }
-    }
 
-    /* ========================================
-       FOOTER
-       ======================================== */
-    .fiori-footer {
-        position: fixed;
-        bottom: 0;
-        left: 0;
-        right: 0;
-        text-align: center;
-        padding: 0.75rem 1rem;
-        background: var(--sapBackgroundColor);
-        color: var(--sapContent_LabelColor);
-        font-size: 0.8125rem;
-        border-top: 1px solid #E5E5E5;
-        z-index: 100;
-    }
-</style>
-"""
+@st.cache_resource(show_spinner=False)
+def get_logo_src() -> str:
+    """Return the image source for the SAP logo, built once per process."""
+    if st.get_option("server.enableStaticServing"):
+        return static_url(LOGO_FILE)
+    return f"data:image/png;base64,{get_base64_image(str(STATIC_DIR / LOGO_FILE))}"
 
-st.markdown(FIORI_HORIZON_CSS, unsafe_allow_html=True)
 
+st.markdown(get_theme_css_html(), unsafe_allow_html=True)
 
 
 def render_shell_bar():
     """Render the SAP Fiori Shell Bar (fixed header)."""
-    # Get the SAP logo as base64
-    logo_path = Path(__file__).parent / "saplogo.png"
-    logo_base64 = get_base64_image(str(logo_path))
-    
     shell_html = f"""
     <div class="fiori-shell">
         <div class="shell-logo">
-            <img src="data:image/png;base64,{logo_base64}" alt="SAP" class="sap-logo" />
+            <img src="{get_logo_src()}" alt="SAP" class="sap-logo" />
         </div>
         <span class="shell-title">POM Assistant</span>
         <div class="shell-user">
@@ -663,7 +201,7 @@ def render_empty_state():
             </svg>
         </div>
         <h2 class="fiori-empty-title">Upload Monitoring File</h2>
-        <p class="fiori-empty-text">Drag and drop an Excel file or click to browse.<br/>Supports PO_Ordering and RC_Processing reports.</p>
+        <p class="fiori-empty-text">Drag and drop an Excel file or CSV export, or click to browse.<br/>Supports PO_Ordering and RC_Processing reports.</p>
     </div>
     """
 
@@ -675,123 +213,805 @@ def render_contact_chips(contacts: list):
 
 
 # ============================================================================
-# DATA PROCESSING FUNCTIONS
+# WORKBOOK CACHE
 # ============================================================================
 
-def extract_info_from_excel(df_info: pd.DataFrame) -> dict:
-    """Extract metadata from the Info sheet."""
-    info = {}
+class WorkbookCache:
+    """Shared workbook handles bounded by count, age and the memory they hold.
     
-    for idx, row in df_info.iterrows():
-        key = str(row.iloc[0]).strip() if pd.notna(row.iloc[0]) else ""
-        value = str(row.iloc[1]).strip() if pd.notna(row.iloc[1]) else ""
-        
-        if key == "Realm":
-            info["realm"] = value
-        elif key == "Realms":
-            info["realms"] = value
-        elif key == "PSEE Consultant":
-            info["product_specialist"] = value
-        elif key == "Monitoring Contacts":
-            info["customer_contacts"] = value
-        elif key == "Monitoring":
-            info["monitoring_type"] = value
-        elif key == "Customer Account Name":
-            info["customer_name"] = value
-        elif key == "Data Center":
-            info["data_center"] = value
-    
-    return info
-
-
-def detect_monitoring_type(excel_file) -> Tuple[str, Optional[pd.DataFrame], Optional[pd.DataFrame]]:
-    """Detect the monitoring type from the Excel file."""
-    xl = pd.ExcelFile(excel_file)
-    sheet_names = xl.sheet_names
-    
-    df_info = None
-    df_data = None
-    monitoring_type = None
-    
-    if "Info" in sheet_names:
-        df_info = pd.read_excel(xl, sheet_name="Info")
-    
-    # Check for known query types first
-    if "PO_Ordering" in sheet_names:
-        df_data = pd.read_excel(xl, sheet_name="PO_Ordering")
-        monitoring_type = "PO_Ordering"
-    elif "RC_Processing" in sheet_names:
-        df_data = pd.read_excel(xl, sheet_name="RC_Processing")
-        monitoring_type = "RC_Processing"
-    else:
-        # For other types, find the data sheet (any sheet that's not "Info")
-        data_sheets = [s for s in sheet_names if s != "Info"]
-        if data_sheets:
-            data_sheet_name = data_sheets[0]
-            df_data = pd.read_excel(xl, sheet_name=data_sheet_name)
-            monitoring_type = data_sheet_name  # Use the sheet name as the type
-    
-    return monitoring_type, df_info, df_data
-
-
-def has_query_support(monitoring_type: str) -> bool:
-    """Check if the monitoring type has AQL query support."""
-    return monitoring_type in ["PO_Ordering", "RC_Processing"]
-
-
-def generate_po_ordering_query(unique_names: list) -> str:
-    """Generate AQL query for PO Ordering."""
-    names_str = ", ".join([f"'{name}'" for name in unique_names])
-    
-    query = f"""SELECT
-UniqueName "PO ID Ariba",
-OrderID "Order ID SAP",
-Name "PO Title",
-StatusString "Status",
-"Active" "Active",
-TimeCreated,
-TimeUpdated,
-Recipients.OrderingMethod "Ordering Method",
-Recipients.State "Recipient State",
-Recipients.FailureReason "Failure Reason",
-Recipients.TimeCreated "Recipient TimeCreated",
-Recipients.TimeUpdated "Recipient TimeUpdated",
-Supplier.Name as "Supplier Name",
-Supplier.UniqueName as "Supplier ID",
-SupplierLocation.PreferredOrderingMethod as SupplierOrderingMethod,
-SupplierLocation.EmailAddress as EmailAddress,
-SupplierLocation.AribaNetworkId as AribaNetworkId,
-this
-FROM ariba.purchasing.core.PurchaseOrder
-WHERE UniqueName IN ({names_str})
-ORDER BY StatusString, UniqueName, TimeCreated, Recipients.OrderingMethod"""
-    
-    return query
-
-
-def generate_rc_processing_query(unique_names: list) -> str:
-    """Generate AQL query for RC Processing."""
-    names_str = ", ".join([f"'{name}'" for name in unique_names])
-    
-    query = f"""SELECT DISTINCT UniqueName as "Id",
-UniqueName,
-StatusString,
-CreateDate,
-ApprovedDate,
-'Awaiting processing' ProcessedStateString
-FROM ariba.receiving.core.Receipt
-WHERE StatusString = 'Approved'
-AND ProcessedState = 1
-AND UniqueName IN ({names_str})
-ORDER BY ApprovedDate DESC"""
-    
-    return query
+    Handles grow as their parts are loaded, so the memory limit is checked on
+    every access: least recently used handles are dropped until the rest fit
+    in ``max_bytes``. The handle being accessed is always kept.
+    """
+    
+    def __init__(self, max_entries: int, ttl_seconds: float, max_bytes: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # key -> (handle, time of creation), least recently used first
+        self._entries = collections.OrderedDict()
+    
+    def get(self, key: tuple, open_handle) -> LazyWorkbook:
+        """Return the handle for ``key``, creating it with ``open_handle()`` on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[1] > self.ttl_seconds:
+                del self._entries[key]
+                entry = None
+        if entry is None:
+            # Opened outside the lock so that one slow upload does not block the others
+            handle = open_handle()
+            with self._lock:
+                entry = self._entries.setdefault(key, (handle, time.monotonic()))
+        with self._lock:
+            self._entries.move_to_end(key)
+            self._evict(key)
+        return entry[0]
+    
+    def _evict(self, keep: tuple):
+        now = time.monotonic()
+        for key, (_, created) in list(self._entries.items()):
+            if key != keep and now - created > self.ttl_seconds:
+                del self._entries[key]
+        while len(self._entries) > max(self.max_entries, 1):
+            self._entries.popitem(last=False)
+        if self.max_bytes <= 0:
+            return
+        sizes = {key: sum(handle.memory_usage().values()) for key, (handle, _) in self._entries.items()}
+        total = sum(sizes.values())
+        for key in list(self._entries):
+            if total <= self.max_bytes:
+                break
+            if key != keep:
+                del self._entries[key]
+                total -= sizes[key]
+
+
+@st.cache_resource
+def get_workbook_cache() -> WorkbookCache:
+    """Workbook handles of this server process, shared by all sessions."""
+    return WorkbookCache(WORKBOOK_CACHE_MAX_ENTRIES, WORKBOOK_CACHE_TTL_SECONDS, WORKBOOK_CACHE_MAX_MB * 1024 * 1024)
+
+
+def get_workbook(content_hash: str, file_name: str, file_bytes: bytes) -> LazyWorkbook:
+    """Return the shared lazy handle for a report, one per distinct content and name.
+    
+    Handles are keyed on ``content_hash`` and ``file_name`` (which picks the
+    reader and may carry the monitoring type of CSV exports). Least recently
+    used handles are evicted past ``WORKBOOK_CACHE_MAX_ENTRIES`` entries or
+    ``WORKBOOK_CACHE_MAX_MB`` of memory and expire after the TTL. The handle
+    is shared by reference, so whatever one session loads is reused by all.
+    A handle that has released its upload gets ``file_bytes`` back, in case
+    the sheet cache has pruned its copy.
+    """
+    def open_handle():
+        from processing import open_report
+        with st.spinner("Reading workbook..."):
+            return open_report(file_bytes, file_name, content_hash)
+    workbook = get_workbook_cache().get((content_hash, file_name), open_handle)
+    workbook.restore_file_bytes(file_bytes)
+    return workbook
+
+
+@st.cache_resource
+def get_parse_pool() -> ProcessPoolExecutor:
+    """Process pool for parsing several workbooks at once, shared by all sessions."""
+    # spawn avoids forking the multi-threaded Streamlit server
+    return ProcessPoolExecutor(max_workers=PARSE_POOL_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+
+
+@st.cache_resource
+def get_load_pool() -> ThreadPoolExecutor:
+    """Threads that parse uploads off the script thread, shared by all sessions."""
+    return ThreadPoolExecutor(max_workers=LOAD_POOL_WORKERS, thread_name_prefix="pom-load")
+
+
+@st.cache_resource
+def get_snapshot_store() -> SnapshotStore:
+    """Store of the previous reports' IDs per realm and type, shared by all sessions."""
+    return SnapshotStore()
+
+
+@st.cache_resource(show_spinner=False)
+def get_id_history() -> IdHistory:
+    """SQLite history of every processed report's IDs (opened on the history writer thread)."""
+    return IdHistory()
+
+
+@st.cache_resource
+def get_history_writer() -> ThreadPoolExecutor:
+    """Single background thread that records reports into the ID history, one at a time."""
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="pom-history")
 
 
 # ============================================================================
 # MAIN APPLICATION
 # ============================================================================
 
+def start_stage_recorder() -> StageRecorder:
+    """Create the stage recorder for this script run."""
+    enabled = DIAGNOSTICS_ENABLED or st.query_params.get("diagnostics") == "1"
+    recorder = StageRecorder(enabled=enabled)
+    st.session_state["stage_recorder"] = recorder
+    return recorder
+
+
+def get_stage_recorder() -> StageRecorder:
+    """Return the recorder of the current run (a no-op one when diagnostics are off)."""
+    return st.session_state.get("stage_recorder", DISABLED_RECORDER)
+
+
+def render_diagnostics_panel(recorder: StageRecorder):
+    """Render the collected stage measurements with a JSON export."""
+    with st.expander("Diagnostics"):
+        st.dataframe(
+            recorder.to_rows(),
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "seconds": st.column_config.NumberColumn("Wall time (s)", format="%.4f"),
+                "peak_mb": st.column_config.NumberColumn("Peak memory (MB)", format="%.2f"),
+            },
+        )
+        st.caption(f"Script run total: {recorder.total_seconds:.3f} s")
+        st.download_button(
+            "Export diagnostics (JSON)",
+            data=recorder.to_json(),
+            file_name="pom_diagnostics.json",
+            mime="application/json",
+        )
+
+
+def render_type_badge(monitoring_type: str) -> str:
+    """Render the status badge for a monitoring type."""
+    # Status Badge - different styles for different types
+    if monitoring_type == "PO_Ordering":
+        return render_status_badge("PO Ordering", "info")
+    elif monitoring_type == "RC_Processing":
+        return render_status_badge("RC Processing", "success")
+    # Format the monitoring type name nicely (replace underscores with spaces)
+    display_name = monitoring_type.replace("_", " ")
+    return render_status_badge(display_name, "warning")
+
+
+def render_batch_settings(key: str) -> tuple:
+    """Batch limit and compaction widgets; returns ``(max_ids, max_bytes, compact)``."""
+    from processing import QUERY_BATCH_MAX_BYTES, QUERY_BATCH_MAX_IDS
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        max_ids = st.number_input(
+            "Max IDs per query",
+            min_value=0,
+            value=QUERY_BATCH_MAX_IDS,
+            step=100,
+            help="Split the IN-list into batches of at most this many IDs (0 = no limit)",
+            key=f"{key}_max_ids",
+        )
+    with col2:
+        max_kb = st.number_input(
+            "Max IN-list size (KB)",
+            min_value=0,
+            value=QUERY_BATCH_MAX_BYTES // 1024,
+            step=16,
+            help="Split the IN-list so that each batch stays below this size (0 = no limit)",
+            key=f"{key}_max_kb",
+        )
+    with col3:
+        compact = st.toggle(
+            "Compact ID ranges",
+            value=QUERY_COMPACT_DEFAULT,
+            help="Select runs of consecutive IDs with range predicates instead of listing each one; "
+            "assumes IDs with the same prefix and length have only digits after the prefix",
+            key=f"{key}_compact",
+        )
+    return max_ids, max_kb * 1024, compact
+
+
+def render_query_section(monitoring_type: str, unique_names: list, title: str = "Generated AQL Query", key: str = "query",
+                         settings: Optional[tuple] = None):
+    """Render the generated AQL, split into batches for large ID sets.
+    
+    ``key`` prefixes the widget keys so that several sections can coexist.
+    ``settings`` are the ``render_batch_settings`` of a parent that shares
+    them between sections; without them the section shows its own. With
+    compaction on, IDs are sorted before batching so that each batch selects
+    its runs of consecutive IDs by range.
+    """
+    from processing import (
+        QUERY_TEMPLATES,
+        compact_query,
+        count_id_batches,
+        estimate_query_size,
+        id_sort_key,
+        iter_id_batches,
+        render_query,
+    )
+    st.markdown(f"### {title}")
+    max_ids, max_bytes, compact = settings if settings is not None else render_batch_settings(key)
+    
+    if compact:
+        unique_names = sorted(unique_names, key=id_sort_key)
+    batch_count = count_id_batches(unique_names, max_ids, max_bytes)
+    
+    if batch_count > 1:
+        batch_number = st.number_input(
+            f"Batch (1-{batch_count})",
+            min_value=1,
+            max_value=batch_count,
+            value=1,
+            key=f"{key}_batch_{batch_count}",
+        )
+        # Only the selected batch is rendered into a query
+        batch = next(itertools.islice(iter_id_batches(unique_names, max_ids, max_bytes), batch_number - 1, None))
+        st.markdown(
+            render_status_badge(f"Batch {batch_number} of {batch_count} · {len(batch)} IDs", "info"),
+            unsafe_allow_html=True,
+        )
+        query_ids = batch
+        file_name = f"{monitoring_type}_batch_{batch_number}_of_{batch_count}.sql"
+    else:
+        query_ids = unique_names
+        file_name = f"{monitoring_type}.sql"
+    
+    template = QUERY_TEMPLATES[monitoring_type]
+    with get_stage_recorder().stage("query_generation") as stage:
+        stage.rows = len(query_ids)
+        if compact:
+            template, query_ids = compact_query(template, query_ids)
+            st.markdown(
+                render_status_badge(f"{stage.rows - len(query_ids)} IDs by range · {len(query_ids)} listed", "success"),
+                unsafe_allow_html=True,
+            )
+        query_size = estimate_query_size(template, query_ids)
+        if query_size > QUERY_INLINE_MAX_BYTES:
+            render_query_download(template, query_ids, query_size, file_name, key)
+        else:
+            # Copyable code block
+            st.code(render_query(template, query_ids), language="sql")
+
+
+def render_realm_queries(workbook: LazyWorkbook, realm_ids: dict, unique_names: list):
+    """One query section per realm, plus every realm's queries as a zip generated in parallel.
+    
+    The batch settings are shown once and apply to every realm and the zip.
+    """
+    from processing import build_realm_queries, realm_file_part
+    monitoring_type = workbook.monitoring_type
+    # Incremental mode may have narrowed the IDs down
+    wanted = set(unique_names)
+    realm_ids = {
+        realm: [name for name in names if name in wanted]
+        for realm, names in realm_ids.items()
+    }
+    realm_ids = {realm: names for realm, names in realm_ids.items() if names}
+    if not realm_ids:
+        return
+    
+    settings = render_batch_settings("query_realm")
+    realm_label = lambda realm: realm or "(no realm)"  # noqa: E731
+    tabs = st.tabs([f"{realm_label(realm)} ({len(names)})" for realm, names in realm_ids.items()])
+    for tab, (realm, names) in zip(tabs, realm_ids.items()):
+        with tab:
+            render_query_section(
+                monitoring_type,
+                names,
+                title=f"Generated AQL Query · {realm_label(realm)}",
+                key=f"query_realm_{realm}",
+                settings=settings,
+            )
+    
+    # The archive is only built on request, and again once the settings change
+    state_key = "realm_queries_zip"
+    zip_key = (workbook.content_hash, tuple((realm, len(names)) for realm, names in realm_ids.items()), settings)
+    archive = st.session_state.get(state_key)
+    if archive is None or archive[0] != zip_key:
+        if not st.button("Generate all realms (.zip)", key="realm_queries_generate"):
+            return
+        with get_stage_recorder().stage("realm_query_generation") as stage:
+            stage.rows = sum(len(names) for names in realm_ids.values())
+            queries = build_realm_queries(monitoring_type, realm_ids, get_parse_pool(), *settings)
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+            for realm, batches in queries.items():
+                text = "\n\n".join(f"-- Batch {number}\n{query}\n" for number, query in enumerate(batches, start=1))
+                zf.writestr(f"{monitoring_type}_{realm_file_part(realm)}.sql", text)
+        archive = (zip_key, buffer.getvalue())
+        st.session_state[state_key] = archive
+    st.download_button(
+        "Download all realms (.zip)",
+        data=archive[1],
+        file_name=f"{monitoring_type}_realms.zip",
+        mime="application/zip",
+        key="realm_queries_download",
+    )
+
+
+def record_id_history(workbook: LazyWorkbook, unique_names: list) -> Future:
+    """Queue the report for the ID history once per session; the future yields the recurring count.
+    
+    The history is opened and written on the writer thread. Recording is
+    best-effort: a database that cannot be opened or written yields None,
+    shown as "N/A", and the page renders as usual.
+    """
+    state_key = f"history_{workbook.content_hash}"
+    if state_key not in st.session_state:
+        realm, monitoring_type, content_hash, file_name = (
+            workbook.info.get("realm"), workbook.monitoring_type, workbook.content_hash, workbook.file_name
+        )
+        
+        def record() -> Optional[int]:
+            try:
+                return get_id_history().record(realm, monitoring_type, content_hash, unique_names, file_name)
+            except (sqlite3.Error, OSError):
+                return None
+        st.session_state[state_key] = get_history_writer().submit(record)
+    return st.session_state[state_key]
+
+
+def format_recurring_count(history_future: Future, timeout: float = HISTORY_WAIT_SECONDS) -> str:
+    """Recurring ID count for a tile, without holding up the page for a slow write."""
+    try:
+        count = history_future.result(timeout=timeout)
+    except FutureTimeoutError:
+        return "…"
+    except Exception:
+        return "N/A"
+    return "N/A" if count is None else str(count)
+
+
+def fill_recurring_tile(tile, history_future: Future, timeout: float = HISTORY_FINAL_WAIT_SECONDS):
+    """Fill the Recurring IDs tile once the history write finishes, waiting at most ``timeout``.
+    
+    The wait is split into short polls with a Streamlit call between them, so
+    any interaction interrupts it with a rerun.
+    """
+    deadline = time.monotonic() + timeout
+    while not history_future.done() and time.monotonic() < deadline:
+        tile.markdown(
+            render_numeric_tile(format_recurring_count(history_future, PROGRESS_POLL_SECONDS), "Recurring IDs"),
+            unsafe_allow_html=True,
+        )
+    tile.markdown(render_numeric_tile(format_recurring_count(history_future, 0), "Recurring IDs"), unsafe_allow_html=True)
+
+
+def get_parse_job(workbook: LazyWorkbook) -> tuple:
+    """This session's background parse of ``workbook`` as ``(key, progress, futures)``.
+    
+    The parse starts on the first call; a parse of a different upload still
+    running for this session is cancelled first.
+    """
+    from processing import ParseProgress
+    key = (workbook.content_hash, workbook.file_name)
+    job = st.session_state.get("parse_job")
+    # A failed parse is retried on the next run, as a synchronous read would be
+    failed = job is not None and any(
+        future.done() and future.exception() is not None for future in job[2].values()
+    )
+    if job is None or job[0] != key or (failed and not job[1].cancelled):
+        cancel_parse_job()
+        progress = ParseProgress()
+        job = (key, progress, workbook.load_in_background(get_load_pool(), progress))
+        st.session_state["parse_job"] = job
+    return job
+
+
+def cancel_parse_job():
+    """Stop and forget this session's background parse, if any."""
+    job = st.session_state.pop("parse_job", None)
+    if job is not None:
+        job[1].cancel()
+
+
+def describe_progress(progress: ParseProgress) -> str:
+    if progress.total_rows:
+        return f"Reading rows: {progress.rows_read:,} of about {progress.total_rows:,}"
+    if progress.rows_read:
+        return f"Reading rows: {progress.rows_read:,}"
+    return "Reading the data sheet..."
+
+
+def wait_for_parse(future: Future, progress: ParseProgress) -> bool:
+    """Show the progress of a background parse until it is done; return False if it was cancelled.
+    
+    Parse errors are re-raised. A new upload or any other interaction
+    interrupts the wait with a rerun, while the parse itself keeps going.
+    """
+    if not future.done() and not progress.cancelled:
+        cancel_slot = st.empty()
+        if cancel_slot.button("Cancel parsing", key="cancel_parse"):
+            progress.cancel()
+        bar = st.empty()
+        while not future.done() and not progress.cancelled:
+            bar.progress(progress.fraction or 0.0, text=describe_progress(progress))
+            try:
+                future.result(timeout=PROGRESS_POLL_SECONDS)
+            except FutureTimeoutError:
+                pass
+            except Exception:
+                break
+        cancel_slot.empty()
+        bar.empty()
+    
+    # A parse that finished before the cancellation arrived is still usable
+    if progress.cancelled and not (future.done() and future.exception() is None):
+        return False
+    future.result()
+    return True
+
+
+def render_incremental_section(workbook: LazyWorkbook, unique_names: list) -> Optional[list]:
+    """Compare with the previous report of the same realm and type; return the IDs to query.
+    
+    Returns None when there is nothing left to query.
+    """
+    if not st.toggle(
+        "Incremental mode",
+        value=INCREMENTAL_MODE_DEFAULT,
+        help="Compare with the previous report of this realm and type and query only the new IDs",
+    ):
+        return unique_names
+    
+    realm = workbook.info.get("realm")
+    if not realm:
+        st.info("Incremental mode needs a Realm in the Info sheet; querying all IDs.")
+        return unique_names
+    
+    # Recording is idempotent per content, but reading the snapshot once per session is enough
+    state_key = f"delta_{workbook.content_hash}"
+    if state_key not in st.session_state:
+        st.session_state[state_key] = get_snapshot_store().record(
+            realm, workbook.monitoring_type, workbook.content_hash, unique_names, workbook.file_name
+        )
+    delta = st.session_state[state_key]
+    
+    if delta is None:
+        st.info(f"First report recorded for realm {realm}; the next upload will be compared with it.")
+        return unique_names
+    
+    baseline = delta.baseline_file_name or "the previous report"
+    st.caption(f"Compared with {baseline} from {delta.baseline_recorded_at[:16].replace('T', ' ')} UTC")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.markdown(render_numeric_tile(str(len(delta.added)), "New IDs"), unsafe_allow_html=True)
+    with col2:
+        st.markdown(render_numeric_tile(str(len(delta.removed)), "Removed IDs"), unsafe_allow_html=True)
+    with col3:
+        st.markdown(render_numeric_tile(str(delta.unchanged_count), "Unchanged IDs"), unsafe_allow_html=True)
+    
+    if delta.removed:
+        with st.expander("Removed IDs"):
+            st.dataframe({"UniqueName": delta.removed}, use_container_width=True, hide_index=True)
+    
+    scope = st.radio("Query", ["New IDs only", "All IDs"], horizontal=True, key="incremental_scope")
+    if scope == "All IDs":
+        return unique_names
+    if not delta.added:
+        st.success("No new IDs since the previous report.")
+        return None
+    return delta.added
+
+
+def render_query_download(template: str, unique_names: list, query_size: int, file_name: str, key: str):
+    """Offer a large query as a file download with a truncated preview; the file is built on request."""
+    from processing import preview_query, write_query
+    st.markdown(
+        render_status_badge(f"{len(unique_names)} IDs · {query_size / 1024:,.0f} KB · preview only", "warning"),
+        unsafe_allow_html=True,
+    )
+    preview, _ = preview_query(template, unique_names, QUERY_PREVIEW_CHARS)
+    st.code(f"{preview}\n-- ... truncated, download the file for the full query", language="sql")
+    
+    # The file is only built when asked for, and kept for later reruns of the same query
+    state_key = f"{key}_download"
+    payload_key = (file_name, hash(template), hash(tuple(unique_names)))
+    prepared = st.session_state.get(state_key)
+    if prepared is None or prepared[0] != payload_key:
+        if not st.button("Prepare download", key=f"{key}_prepare"):
+            return
+        # Encoded piece by piece, so the text is never built as one string
+        buffer = io.BytesIO()
+        text = io.TextIOWrapper(buffer, encoding="utf-8", write_through=True)
+        write_query(text, template, unique_names)
+        text.detach()
+        prepared = (payload_key, buffer.getvalue())
+        st.session_state[state_key] = prepared
+    st.download_button(
+        "Download query",
+        data=prepared[1],
+        file_name=file_name,
+        mime="application/sql",
+        key=f"{key}_download_button",
+    )
+
+
+def session_memory_bytes(workbooks: list) -> int:
+    """Approximate bytes held by the reports of the current session."""
+    return sum(sum(workbook.memory_usage().values()) for workbook in workbooks)
+
+
+def fits_memory_budget(workbook: LazyWorkbook, session_workbooks: list) -> bool:
+    """Check whether loading the full data sheet keeps all of the session's reports within the budget."""
+    if SESSION_MEMORY_BUDGET_MB <= 0 or workbook.is_loaded("df_data"):
+        return True
+    estimate = RAW_DATA_MEMORY_FACTOR * workbook.file_size
+    return session_memory_bytes(session_workbooks) + estimate <= SESSION_MEMORY_BUDGET_MB * 1024 * 1024
+
+
+def render_memory_usage(workbooks: list):
+    """Caption with the session's memory use; uploads whose IDs are parsed are released to disk."""
+    usage = session_memory_bytes(workbooks) / (1024 * 1024)
+    text = f"Session memory: {usage:.1f} MB"
+    if SESSION_MEMORY_BUDGET_MB > 0:
+        text += f" of {SESSION_MEMORY_BUDGET_MB} MB"
+    released = sum(workbook.release_file_bytes() for workbook in workbooks)
+    if released:
+        text += f" · {released} upload{'s' if released > 1 else ''} moved to disk after parsing"
+    st.caption(text)
+
+
+def render_data_preview(workbook: LazyWorkbook, key: str = "raw") -> int:
+    """Render one page of the data sheet and return its row count.
+    
+    Filtering and sorting run on the server; only the page reaches the browser.
+    """
+    from processing import select_rows
+    df_data = workbook.df_data
+    columns = list(df_data.columns)
+    
+    col1, col2, col3, col4 = st.columns([2, 3, 2, 1])
+    with col1:
+        filter_column = st.selectbox("Filter column", columns, key=f"{key}_filter_column")
+    with col2:
+        filter_text = st.text_input("Contains", key=f"{key}_filter_text")
+    with col3:
+        sort_column = st.selectbox("Sort by", [None] + columns, format_func=lambda c: "(file order)" if c is None else c, key=f"{key}_sort_column")
+    with col4:
+        descending = st.toggle("Descending", key=f"{key}_descending")
+    
+    # Reuse the row selection between page flips of the same view
+    view_key = (workbook.content_hash, filter_column, filter_text, sort_column, descending)
+    view = st.session_state.get(f"{key}_view")
+    if view is None or view[0] != view_key:
+        view = (view_key, select_rows(df_data, filter_column, filter_text, sort_column, descending))
+        st.session_state[f"{key}_view"] = view
+    positions = view[1]
+    
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        page_size = st.selectbox("Rows per page", PREVIEW_PAGE_SIZES, key=f"{key}_page_size")
+    page_count = max(1, -(-len(positions) // page_size))
+    with col2:
+        page = st.number_input(f"Page (1-{page_count})", min_value=1, max_value=page_count, value=1, key=f"{key}_page_{page_count}")
+    
+    start = (page - 1) * page_size
+    page_positions = positions[start:start + page_size]
+    st.dataframe(df_data.iloc[page_positions], use_container_width=True)
+    
+    if len(page_positions):
+        shown = f"Rows {start + 1}-{start + len(page_positions)} of {len(positions)}"
+    else:
+        shown = "No matching rows"
+    if len(positions) != len(df_data):
+        shown += f" (filtered from {len(df_data)})"
+    st.caption(shown)
+    
+    if st.toggle("Show column statistics", key=f"{key}_stats"):
+        st.dataframe(workbook.column_stats, use_container_width=True, hide_index=True)
+    
+    return len(page_positions)
+
+
+def render_summary_breakdowns(summary: dict):
+    """One row of numeric tiles per breakdown, e.g. rows per status or age bucket."""
+    for title, counts in summary.items():
+        tiles = list(counts.items())
+        if len(tiles) > SUMMARY_MAX_TILES:
+            other = sum(count for _, count in tiles[SUMMARY_MAX_TILES - 1:])
+            tiles = tiles[:SUMMARY_MAX_TILES - 1] + [(f"Other ({len(tiles) - SUMMARY_MAX_TILES + 1})", other)]
+        st.markdown(f"**{title}**")
+        for col, (label, count) in zip(st.columns(SUMMARY_MAX_TILES), tiles):
+            with col:
+                st.markdown(render_numeric_tile(f"{count:,}", label), unsafe_allow_html=True)
+
+
+def render_report(workbook: LazyWorkbook, session_workbooks: list):
+    """Render the report view for a single uploaded workbook.
+    
+    ``session_workbooks`` are all reports of the session, which share its
+    memory budget.
+    """
+    from processing import has_query_support, parse_realm_list
+    monitoring_type = workbook.monitoring_type
+    
+    if monitoring_type is None:
+        st.error("Could not detect monitoring type. Please ensure the file contains a valid data sheet.")
+        return
+    
+    st.markdown(render_type_badge(monitoring_type), unsafe_allow_html=True)
+    
+    recorder = get_stage_recorder()
+    # Info and the IDs are read side by side; Info is short and renders first
+    _, progress, futures = get_parse_job(workbook)
+    with recorder.stage("extract_info_from_excel", cached=workbook.is_loaded("info")):
+        info = futures["info"].result()
+    
+    # Report Information Section
+    st.markdown("### Report Information")
+    
+    tiles = [
+        (label, info.get(field, 'N/A'))
+        for label, field, always_shown in INFO_TILES
+        if always_shown or field in info
+    ]
+    for row_start in range(0, len(tiles), 3):
+        for col, (label, value) in zip(st.columns(3), tiles[row_start:row_start + 3]):
+            with col:
+                st.markdown(render_info_tile(label, value), unsafe_allow_html=True)
+    
+    # Customer Contacts
+    contacts = info.get('customer_contacts', '')
+    if contacts and contacts != 'N/A':
+        st.markdown("### Customer Contacts")
+        contact_list = [c.strip() for c in contacts.split(',')]
+        st.markdown(f'<div class="fiori-card">{render_contact_chips(contact_list)}</div>', unsafe_allow_html=True)
+    
+    # Process Data
+    if workbook.data_sheet is not None:
+        # Summary KPIs
+        st.markdown("### Summary")
+        
+        # Check if UniqueName column exists for record counting
+        with recorder.stage("unique_extraction", cached=workbook.is_loaded("unique_names")) as stage:
+            if not wait_for_parse(futures["query_ids"], progress):
+                st.info("Parsing was cancelled. Upload another file, or parse this one again.")
+                if st.button("Parse again"):
+                    cancel_parse_job()
+                    st.rerun()
+                return
+            unique_names = workbook.unique_names
+            stage.rows = len(unique_names) if unique_names is not None else None
+        if unique_names is not None:
+            record_count = len(unique_names)
+        else:
+            record_count = len(workbook.df_data)
+        
+        with recorder.stage("id_normalization", cached=workbook.is_loaded("normalized_ids")) as stage:
+            query_ids = workbook.query_ids
+            stage.rows = len(query_ids) if query_ids is not None else None
+        
+        history_future = None
+        recurring_tile = None
+        if HISTORY_ENABLED and query_ids is not None:
+            history_future = record_id_history(workbook, query_ids)
+        
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            st.markdown(render_numeric_tile(str(record_count), "Total Records"), unsafe_allow_html=True)
+        
+        with col2:
+            if history_future is not None:
+                recurring_tile = st.empty()
+                recurring_tile.markdown(render_numeric_tile(format_recurring_count(history_future), "Recurring IDs"), unsafe_allow_html=True)
+        
+        with col3:
+            # Show monitoring type abbreviation
+            if monitoring_type == "PO_Ordering":
+                type_label = "PO"
+            elif monitoring_type == "RC_Processing":
+                type_label = "RC"
+            else:
+                type_label = monitoring_type[:3].upper() if len(monitoring_type) >= 3 else monitoring_type.upper()
+            st.markdown(render_numeric_tile(type_label, "Record Type"), unsafe_allow_html=True)
+        
+        with recorder.stage("summary_analytics", cached=workbook.is_loaded("summary")):
+            try:
+                summary = workbook.summary
+            except Exception as e:
+                summary = {}
+                st.caption(f"Breakdowns are not available: {e}")
+        render_summary_breakdowns(summary)
+        
+        rejected = workbook.rejected_ids
+        if rejected is not None and len(rejected):
+            with st.expander(f"Rejected IDs ({len(rejected)})"):
+                st.caption("These values are not valid IDs after normalization and are left out of the query.")
+                st.dataframe(rejected, use_container_width=True, hide_index=True)
+        
+        # Generate Query - only for supported types
+        if has_query_support(monitoring_type) and query_ids is not None:
+            query_names = render_incremental_section(workbook, query_ids)
+            if query_names is not None:
+                with recorder.stage("realm_split", cached=workbook.is_loaded("realm_ids")):
+                    realm_ids = workbook.realm_ids
+                if realm_ids is not None and st.toggle(
+                    f"Split by realm ({len(realm_ids)} realms)",
+                    value=True,
+                    help="Generate a separate query for each realm covered by the report",
+                    key="split_realms",
+                ):
+                    render_realm_queries(workbook, realm_ids, query_names)
+                else:
+                    if realm_ids is None and len(parse_realm_list(workbook.info.get("realms"))) > 1:
+                        st.caption("The report lists several realms but has no Realm column, so one query covers all of them.")
+                    render_query_section(monitoring_type, query_names)
+        
+        # Data Preview
+        st.markdown("### Raw Data")
+        show_raw_data = not has_query_support(monitoring_type)
+        with st.expander("View uploaded data", expanded=show_raw_data):
+            # The full frame is only read once somebody asks for it
+            if not fits_memory_budget(workbook, session_workbooks):
+                st.warning(
+                    f"Loading the raw data would exceed this session's memory budget of "
+                    f"{SESSION_MEMORY_BUDGET_MB} MB. Remove other uploads or raise POM_SESSION_MEMORY_BUDGET_MB."
+                )
+            elif show_raw_data or workbook.is_loaded("df_data") or st.toggle("Load raw data"):
+                with recorder.stage("dataframe_rendering", cached=workbook.is_loaded("df_data")) as stage:
+                    stage.rows = render_data_preview(workbook)
+        
+        if recurring_tile is not None and not history_future.done():
+            # The rest of the page is out; fill in the count once the write finishes
+            fill_recurring_tile(recurring_tile, history_future)
+        
+    else:
+        st.error("Could not find data in the uploaded file.")
+
+
+def render_multi_report(file_names: list, workbooks: list):
+    """Render merged queries for several workbooks, deduplicated per monitoring type."""
+    from processing import has_query_support, load_workbooks_parallel
+    # Read the ID columns of all files side by side
+    with get_stage_recorder().stage("parallel_parse") as stage:
+        stage.rows = len(workbooks)
+        load_workbooks_parallel(workbooks, get_parse_pool())
+    
+    file_rows = []
+    ids_by_type = {}
+    for file_name, workbook in zip(file_names, workbooks):
+        unique_names = workbook.unique_names
+        query_ids = workbook.query_ids
+        file_rows.append({
+            "File": file_name,
+            "Monitoring Type": workbook.monitoring_type or "Unknown",
+            "Realm": workbook.info.get("realm", "N/A"),
+            "Records": len(unique_names) if unique_names is not None else None,
+            "Rejected IDs": len(workbook.rejected_ids) if unique_names is not None else None,
+        })
+        if workbook.monitoring_type is not None and query_ids is not None:
+            ids_by_type.setdefault(workbook.monitoring_type, []).append(query_ids)
+    
+    # Deduplicate across files, keeping first-seen order
+    merged_by_type = {
+        monitoring_type: list(dict.fromkeys(itertools.chain.from_iterable(id_lists)))
+        for monitoring_type, id_lists in ids_by_type.items()
+    }
+    
+    badges = " ".join(render_type_badge(monitoring_type) for monitoring_type in merged_by_type)
+    st.markdown(badges, unsafe_allow_html=True)
+    
+    st.markdown("### Uploaded Files")
+    st.dataframe(file_rows, use_container_width=True, hide_index=True)
+    
+    st.markdown("### Summary")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown(render_numeric_tile(str(len(workbooks)), "Files"), unsafe_allow_html=True)
+    with col2:
+        total_records = sum(len(unique_names) for unique_names in merged_by_type.values())
+        st.markdown(render_numeric_tile(str(total_records), "Unique Records"), unsafe_allow_html=True)
+    
+    for monitoring_type, unique_names in merged_by_type.items():
+        if has_query_support(monitoring_type):
+            render_query_section(
+                monitoring_type,
+                unique_names,
+                title=f"Generated AQL Query · {monitoring_type.replace('_', ' ')}",
+                key=f"query_{monitoring_type}",
+            )
+
+
 def main():
     # Render Shell Bar
     render_shell_bar()
@@ -807,112 +1027,48 @@ def main():
     
     # File Upload Card
     st.markdown('<div class="fiori-upload-card">', unsafe_allow_html=True)
-    uploaded_file = st.file_uploader(
-        "Select Excel File",
-        type=["xlsx", "xls"],
-        help="Upload a PO_Ordering or RC_Processing monitoring Excel file",
+    uploaded_files = st.file_uploader(
+        "Select Report File",
+        type=["xlsx", "xls", "csv", "tsv", "txt", "gz"],
+        accept_multiple_files=True,
+        help="Upload one or more PO_Ordering or RC_Processing monitoring Excel files or CSV/TSV exports (optionally gzipped)",
         label_visibility="collapsed"
     )
     st.markdown('</div>', unsafe_allow_html=True)
     
-    if uploaded_file is not None:
-        try:
-            # Detect type and extract data
-            monitoring_type, df_info, df_data = detect_monitoring_type(uploaded_file)
-            
-            if monitoring_type is None:
-                st.error("Could not detect monitoring type. Please ensure the file contains a valid data sheet.")
-                return
-            
-            # Extract info
-            info = {}
-            if df_info is not None:
-                info = extract_info_from_excel(df_info)
-            
-            # Status Badge - different styles for different types
-            if monitoring_type == "PO_Ordering":
-                st.markdown(render_status_badge("PO Ordering", "info"), unsafe_allow_html=True)
-            elif monitoring_type == "RC_Processing":
-                st.markdown(render_status_badge("RC Processing", "success"), unsafe_allow_html=True)
-            else:
-                # Format the monitoring type name nicely (replace underscores with spaces)
-                display_name = monitoring_type.replace("_", " ")
-                st.markdown(render_status_badge(display_name, "warning"), unsafe_allow_html=True)
-            
-            # Report Information Section
-            st.markdown("### Report Information")
-            
-            col1, col2, col3 = st.columns(3)
-            
-            with col1:
-                st.markdown(render_info_tile("Realm", info.get('realm', 'N/A')), unsafe_allow_html=True)
-            
-            with col2:
-                st.markdown(render_info_tile("Product Specialist", info.get('product_specialist', 'N/A')), unsafe_allow_html=True)
-            
-            with col3:
-                st.markdown(render_info_tile("Data Center", info.get('data_center', 'N/A')), unsafe_allow_html=True)
-            
-            # Customer Contacts
-            contacts = info.get('customer_contacts', '')
-            if contacts and contacts != 'N/A':
-                st.markdown("### Customer Contacts")
-                contact_list = [c.strip() for c in contacts.split(',')]
-                st.markdown(f'<div class="fiori-card">{render_contact_chips(contact_list)}</div>', unsafe_allow_html=True)
-            
-            # Process Data
-            if df_data is not None:
-                # Summary KPIs
-                st.markdown("### Summary")
+    recorder = start_stage_recorder()
+    try:
+        if uploaded_files:
+            try:
+                from processing import get_content_hash
                 
-                # Check if UniqueName column exists for record counting
-                if "UniqueName" in df_data.columns:
-                    unique_names = df_data["UniqueName"].dropna().unique().tolist()
-                    record_count = len(unique_names)
+                # Detect type and extract data (cached by file content)
+                workbooks = []
+                for uploaded_file in uploaded_files:
+                    file_bytes = uploaded_file.getvalue()
+                    with recorder.stage("detect_monitoring_type"):
+                        workbooks.append(get_workbook(get_content_hash(file_bytes), uploaded_file.name, file_bytes))
+            
+                if len(workbooks) == 1:
+                    render_report(workbooks[0], workbooks)
                 else:
-                    record_count = len(df_data)
-                
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    st.markdown(render_numeric_tile(str(record_count), "Total Records"), unsafe_allow_html=True)
-                
-                with col2:
-                    # Show monitoring type abbreviation
-                    if monitoring_type == "PO_Ordering":
-                        type_label = "PO"
-                    elif monitoring_type == "RC_Processing":
-                        type_label = "RC"
-                    else:
-                        type_label = monitoring_type[:3].upper() if len(monitoring_type) >= 3 else monitoring_type.upper()
-                    st.markdown(render_numeric_tile(type_label, "Record Type"), unsafe_allow_html=True)
-                
-                # Generate Query - only for supported types
-                if has_query_support(monitoring_type) and "UniqueName" in df_data.columns:
-                    st.markdown("### Generated AQL Query")
-                    
-                    if monitoring_type == "PO_Ordering":
-                        query = generate_po_ordering_query(unique_names)
-                    else:
-                        query = generate_rc_processing_query(unique_names)
-                    
-                    # Copyable code block
-                    st.code(query, language="sql")
-                
-                # Data Preview
-                st.markdown("### Raw Data")
-                with st.expander("View uploaded data", expanded=not has_query_support(monitoring_type)):
-                    st.dataframe(df_data, use_container_width=True)
-                
-            else:
-                st.error("Could not find data in the uploaded file.")
-                
-        except Exception as e:
-            st.error(f"Error processing file: {str(e)}")
+                    cancel_parse_job()
+                    render_multi_report([f.name for f in uploaded_files], workbooks)
+                render_memory_usage(workbooks)
+            
+            except Exception as e:
+                st.error(f"Error processing file: {str(e)}")
     
-    else:
-        # Empty State
-        st.markdown(render_empty_state(), unsafe_allow_html=True)
+        else:
+            cancel_parse_job()
+            # Empty State
+            st.markdown(render_empty_state(), unsafe_allow_html=True)
+    
+    finally:
+        recorder.close()
+    
+    if recorder.enabled:
+        render_diagnostics_panel(recorder)
     
     # Close content wrapper
     st.markdown('</div>', unsafe_allow_html=True)
@@ -0,0 +1,335 @@
+"""Headless batch run over a directory of monitoring workbooks and CSV exports.
+
+Parses every workbook in a process pool, writes one ``.sql`` file per report
+with query support and a ``summary.json`` describing the whole run. With
+``--recursive`` the subdirectories of the reports are mirrored in the output
+directory, so reports of the same name do not overwrite each other.
+
+With ``--incremental`` each report is compared with the previous report of
+its realm and type, and only the IDs new since then are queried. With
+``--split-realms`` a report covering several realms gets one ``.sql`` file
+per realm instead.
+
+Usage:
+    python batch_cli.py REPORT_DIR --output OUT_DIR [--workers N] [--incremental] [--split-realms]
+"""
+
+import argparse
+import collections
+import json
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Optional
+
+from processing import (
+    QUERY_BATCH_MAX_BYTES,
+    QUERY_BATCH_MAX_IDS,
+    QUERY_TEMPLATES,
+    DELIMITED_SUFFIXES,
+    compact_query,
+    has_query_support,
+    id_sort_key,
+    iter_id_batches,
+    open_report,
+    realm_file_part,
+    write_query,
+)
+from id_history import HISTORY_ENABLED, IdHistory
+from snapshots import SnapshotStore
+
+
+REPORT_SUFFIXES = (".xlsx", ".xls") + DELIMITED_SUFFIXES
+
+
+def find_reports(report_dir: Path, recursive: bool = False) -> list:
+    """List the reports in a directory, skipping Excel lock files."""
+    pattern = "**/*" if recursive else "*"
+    return sorted(
+        path for path in report_dir.glob(pattern)
+        if path.is_file() and path.name.lower().endswith(REPORT_SUFFIXES) and not path.name.startswith("~$")
+    )
+
+
+def write_queries(query_path: Path, template: str, id_batches, compact: bool = False) -> int:
+    """Stream one query per ID batch into a single file and return the batch count."""
+    batch_count = 0
+    with open(query_path, "w", encoding="utf-8") as f:
+        for batch_count, batch in enumerate(id_batches, start=1):
+            if batch_count > 1:
+                f.write("\n\n")
+            f.write(f"-- Batch {batch_count}\n")
+            if compact:
+                write_query(f, *compact_query(template, batch))
+            else:
+                write_query(f, template, batch)
+            f.write("\n")
+    return batch_count
+
+
+def output_stems(report_paths: list) -> dict:
+    """Output file stem of every report, unique within the run.
+    
+    Stems are the report's path below the directory all reports share,
+    without the suffix, so reports of the same name in different
+    subdirectories write to mirrored subdirectories. Reports that differ only
+    by suffix (``report.xlsx``, ``report.csv``) keep their full name.
+    """
+    if not report_paths:
+        return {}
+    root = Path(os.path.commonpath([Path(path).parent for path in report_paths]))
+    relative = {path: Path(path).relative_to(root) for path in report_paths}
+    stems = {path: name.with_suffix("") for path, name in relative.items()}
+    counts = collections.Counter(stems.values())
+    return {
+        path: (relative[path] if counts[stem] > 1 else stem).as_posix()
+        for path, stem in stems.items()
+    }
+
+
+def scan_report(report_path: str, report_name: str, split_realms: bool = False) -> tuple:
+    """Parse one report. Runs inside a worker process.
+    
+    Returns the report's summary row and what its queries need: the content
+    hash, the query IDs (None without a UniqueName column) and, with
+    ``split_realms``, the IDs per realm.
+    """
+    started = time.perf_counter()
+    result = {
+        "file": report_name,
+        "realm": None,
+        "monitoring_type": None,
+        "record_count": None,
+        "rejected_count": None,
+        "query_file": None,
+        "batch_count": 0,
+        "recurring_count": None,
+        "delta": None,
+        "realms": None,
+        "timings": {},
+        "error": None,
+    }
+    scan = {"content_hash": None, "query_ids": None, "realm_ids": None}
+    timings = result["timings"]
+
+    try:
+        t0 = time.perf_counter()
+        workbook = open_report(Path(report_path).read_bytes(), os.path.basename(report_path))
+        result["monitoring_type"] = workbook.monitoring_type
+        scan["content_hash"] = workbook.content_hash
+        timings["open_s"] = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        info = workbook.info
+        result["realm"] = info.get("realm")
+        timings["info_s"] = time.perf_counter() - t0
+
+        if workbook.monitoring_type is None:
+            result["error"] = "Could not detect monitoring type"
+            return result, scan
+
+        t0 = time.perf_counter()
+        unique_names = workbook.unique_names
+        if unique_names is not None:
+            result["record_count"] = len(unique_names)
+        else:
+            result["record_count"] = len(workbook.df_data)
+        timings["records_s"] = time.perf_counter() - t0
+
+        query_ids = workbook.query_ids
+        if query_ids is not None:
+            result["rejected_count"] = len(workbook.rejected_ids)
+
+        if split_realms and has_query_support(workbook.monitoring_type) and query_ids:
+            scan["realm_ids"] = workbook.realm_ids
+        scan["query_ids"] = query_ids
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        timings["total_s"] = time.perf_counter() - started
+
+    return result, scan
+
+
+def record_history(history: IdHistory, result: dict, scan: dict):
+    """Add a scanned report to the ID history; a failure is reported but does not fail the report."""
+    try:
+        result["recurring_count"] = history.record(
+            result["realm"], result["monitoring_type"], scan["content_hash"], scan["query_ids"], result["file"]
+        )
+    except (sqlite3.Error, OSError) as e:
+        print(f"Warning: {result['file']} was not added to the ID history: {e}", file=sys.stderr)
+
+
+def open_history() -> Optional[IdHistory]:
+    """The ID history to record reports in, or None when it is disabled or cannot be opened."""
+    if not HISTORY_ENABLED:
+        return None
+    try:
+        return IdHistory()
+    except (sqlite3.Error, OSError) as e:
+        print(f"Warning: the ID history is not recorded in this run: {e}", file=sys.stderr)
+        return None
+
+
+def finish_report(result: dict, scan: dict, history: Optional[IdHistory], snapshots: Optional[SnapshotStore],
+                  output_dir: Path, output_stem: str, max_ids: int, max_bytes: int, compact: bool = False):
+    """Record a scanned report and write its queries. Runs in the main process.
+    
+    ``history`` is None when the ID history is off, ``snapshots`` unless
+    the run is incremental. Query files are named after ``output_stem``, a
+    path relative to ``output_dir``.
+    """
+    query_ids = scan["query_ids"]
+    if result["error"] or query_ids is None:
+        return
+    started = time.perf_counter()
+    timings = result["timings"]
+
+    if history is not None:
+        record_history(history, result, scan)
+
+    try:
+        query_names = query_ids
+        if snapshots is not None and result["realm"]:
+            delta = snapshots.record(
+                result["realm"], result["monitoring_type"], scan["content_hash"], query_ids, result["file"]
+            )
+            if delta is not None:
+                query_names = delta.added
+                result["delta"] = {
+                    "baseline_file": delta.baseline_file_name,
+                    "added": len(delta.added),
+                    "removed": len(delta.removed),
+                    "unchanged": delta.unchanged_count,
+                }
+
+        if has_query_support(result["monitoring_type"]) and query_names:
+            t0 = time.perf_counter()
+            # One ID list per output file; a single unnamed one unless split by realm
+            id_lists = {None: query_names}
+            if scan["realm_ids"] is not None:
+                wanted = set(query_names)
+                id_lists = {
+                    realm: [name for name in realm_ids if name in wanted]
+                    for realm, realm_ids in scan["realm_ids"].items()
+                }
+                result["realms"] = {}
+            for realm, names in id_lists.items():
+                if not names:
+                    continue
+                if compact:
+                    # Sorted batches keep runs of consecutive IDs together
+                    names = sorted(names, key=id_sort_key)
+                stem = output_stem if realm is None else f"{output_stem}.{realm_file_part(realm)}"
+                query_path = output_dir / f"{stem}.sql"
+                query_path.parent.mkdir(parents=True, exist_ok=True)
+                batch_count = write_queries(
+                    query_path,
+                    QUERY_TEMPLATES[result["monitoring_type"]],
+                    iter_id_batches(names, max_ids, max_bytes),
+                    compact,
+                )
+                result["batch_count"] += batch_count
+                if realm is None:
+                    result["query_file"] = f"{stem}.sql"
+                else:
+                    result["realms"][realm] = {
+                        "id_count": len(names),
+                        "query_file": f"{stem}.sql",
+                        "batch_count": batch_count,
+                    }
+            timings["query_s"] = time.perf_counter() - t0
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        timings["total_s"] += time.perf_counter() - started
+
+
+def run_batch(report_paths: list, output_dir: Path, workers: int, max_ids: int, max_bytes: int,
+              incremental: bool = False, compact: bool = False, split_realms: bool = False) -> dict:
+    """Process the reports and return the run summary.
+    
+    Reports are parsed across a process pool. The ID history, snapshots
+    and query files are then written by this process, one report at a time
+    in path order, so that each report's baseline does not depend on which
+    worker finished first and SQLite sees a single writer.
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    started = time.perf_counter()
+    report_paths = sorted(report_paths)
+    stems = output_stems(report_paths)
+    scanned = {}
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(
+                scan_report, str(path), Path(stems[path]).with_name(Path(path).name).as_posix(), split_realms
+            ): path
+            for path in report_paths
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            result, scan = future.result()
+            scanned[futures[future]] = (result, scan)
+            status = result["error"] or f"{result['monitoring_type']}, {result['record_count']} records"
+            print(f"[{done}/{len(futures)}] {result['file']}: {status}", file=sys.stderr)
+
+    history = open_history()
+    snapshots = SnapshotStore() if incremental else None
+    results = []
+    for path in report_paths:
+        result, scan = scanned[path]
+        finish_report(result, scan, history, snapshots, output_dir, stems[path], max_ids, max_bytes, compact)
+        results.append(result)
+
+    return {
+        "report_count": len(results),
+        "failed_count": sum(1 for r in results if r["error"]),
+        "workers": workers,
+        "wall_time_s": time.perf_counter() - started,
+        "reports": results,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Generate AQL queries for a directory of monitoring reports.")
+    parser.add_argument("report_dir", type=Path, help="Directory containing monitoring workbooks")
+    parser.add_argument("-o", "--output", type=Path, default=Path("pom_output"), help="Directory for query files and summary.json")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count(), help="Worker processes (default: CPU count)")
+    parser.add_argument("-r", "--recursive", action="store_true", help="Also search subdirectories")
+    parser.add_argument("--max-ids", type=int, default=QUERY_BATCH_MAX_IDS, help="Max IDs per query batch (0 = no limit)")
+    parser.add_argument("--max-bytes", type=int, default=QUERY_BATCH_MAX_BYTES, help="Max IN-list bytes per batch (0 = no limit)")
+    parser.add_argument("--incremental", action="store_true", help="Query only IDs new since the previous report of each realm")
+    parser.add_argument("--compact", action="store_true", help="Select runs of consecutive IDs with range predicates (assumes digits-only IDs after each prefix)")
+    parser.add_argument("--split-realms", action="store_true", help="Write one query file per realm of multi-realm reports")
+    args = parser.parse_args(argv)
+
+    if not args.report_dir.is_dir():
+        parser.error(f"not a directory: {args.report_dir}")
+
+    report_paths = find_reports(args.report_dir, args.recursive)
+    if not report_paths:
+        print(f"No workbooks found in {args.report_dir}", file=sys.stderr)
+        return 1
+
+    summary = run_batch(
+        report_paths, args.output, args.workers, args.max_ids, args.max_bytes,
+        args.incremental, args.compact, args.split_realms,
+    )
+    summary_path = args.output / "summary.json"
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2, default=str)
+
+    print(
+        f"Processed {summary['report_count']} reports ({summary['failed_count']} failed) "
+        f"in {summary['wall_time_s']:.1f}s; summary written to {summary_path}",
+        file=sys.stderr,
+    )
+    return 1 if summary["failed_count"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
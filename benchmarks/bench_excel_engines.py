@@ -0,0 +1,87 @@
+"""Benchmark the openpyxl and calamine Excel engines on synthetic reports.
+
+For each size this times reading the full data sheet and reading only the
+UniqueName column with both engines, next to the openpyxl streaming dedupe
+the app uses without calamine. The frames from both engines are compared
+for exact equality, including the dtype of UniqueName, before timing.
+
+Usage:
+    python benchmarks/bench_excel_engines.py [--sizes 1000 10000 50000] [--repeat 3]
+"""
+
+import argparse
+import io
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent))
+
+from processing import extract_unique_names_streaming, get_excel_engine  # noqa: E402
+from run_benchmarks import best_time, get_workbook_bytes  # noqa: E402
+from synthetic import DATA_COLUMNS  # noqa: E402
+
+ENGINES = ["openpyxl", "calamine"]
+
+
+def read_sheet(data: bytes, sheet_name: str, engine: str, **kwargs) -> pd.DataFrame:
+    return pd.read_excel(io.BytesIO(data), sheet_name=sheet_name, engine=engine, **kwargs)
+
+
+def check_parity(data: bytes, sheet_name: str):
+    """Raise when the engines disagree on values or dtypes."""
+    frames = [read_sheet(data, sheet_name, engine) for engine in ENGINES]
+    pd.testing.assert_frame_equal(*frames, check_exact=True)
+    dtypes = [frame["UniqueName"].dtype for frame in frames]
+    if dtypes[0] != dtypes[1]:
+        raise AssertionError(f"UniqueName dtype differs: {dtypes}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--types", nargs="+", default=["PO_Ordering", "RC_Processing"], choices=list(DATA_COLUMNS))
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10_000, 50_000])
+    parser.add_argument("--duplicates", type=float, default=0.3)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    if get_excel_engine("auto") != "calamine":
+        print("python-calamine is not installed; nothing to compare", file=sys.stderr)
+        return 1
+
+    print(f"{'case':<24} {'stage':<18} {'openpyxl (ms)':>14} {'calamine (ms)':>14} {'speedup':>8}")
+    for monitoring_type in args.types:
+        for rows in args.sizes:
+            data = get_workbook_bytes(monitoring_type, rows, args.duplicates)
+            check_parity(data, monitoring_type)
+            case = f"{monitoring_type}-{rows}"
+
+            stages = {
+                "full sheet": {},
+                "UniqueName only": {},
+            }
+            for engine in ENGINES:
+                stages["full sheet"][engine], _ = best_time(
+                    lambda: read_sheet(data, monitoring_type, engine), args.repeat
+                )
+                stages["UniqueName only"][engine], _ = best_time(
+                    lambda: read_sheet(data, monitoring_type, engine, usecols=["UniqueName"]), args.repeat
+                )
+            streaming, _ = best_time(
+                lambda: extract_unique_names_streaming(io.BytesIO(data), monitoring_type), args.repeat
+            )
+
+            for stage, timings in stages.items():
+                slow, fast = timings["openpyxl"], timings["calamine"]
+                print(f"{case:<24} {stage:<18} {slow * 1000:>14.1f} {fast * 1000:>14.1f} {slow / fast:>7.1f}x")
+            fast = stages["UniqueName only"]["calamine"]
+            print(f"{case:<24} {'openpyxl stream':<18} {streaming * 1000:>14.1f} {fast * 1000:>14.1f} "
+                  f"{streaming / fast:>7.1f}x")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
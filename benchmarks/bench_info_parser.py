@@ -0,0 +1,80 @@
+"""Benchmark the vectorized Info-sheet parser against the old iterrows loop.
+
+Usage:
+    python benchmarks/bench_info_parser.py [--rows 100 1000 10000] [--repeat 5]
+"""
+
+import argparse
+import sys
+import timeit
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from processing import INFO_KEYS, extract_info_from_excel  # noqa: E402
+
+
+def extract_info_iterrows(df_info: pd.DataFrame) -> dict:
+    """The previous row-by-row implementation, kept as the baseline."""
+    info = {}
+
+    for idx, row in df_info.iterrows():
+        key = str(row.iloc[0]).strip() if pd.notna(row.iloc[0]) else ""
+        value = str(row.iloc[1]).strip() if pd.notna(row.iloc[1]) else ""
+
+        if key == "Realm":
+            info["realm"] = value
+        elif key == "Realms":
+            info["realms"] = value
+        elif key == "PSEE Consultant":
+            info["product_specialist"] = value
+        elif key == "Monitoring Contacts":
+            info["customer_contacts"] = value
+        elif key == "Monitoring":
+            info["monitoring_type"] = value
+        elif key == "Customer Account Name":
+            info["customer_name"] = value
+        elif key == "Data Center":
+            info["data_center"] = value
+
+    return info
+
+
+def make_info_frame(rows: int) -> pd.DataFrame:
+    """Build an Info frame like the merged templates: known keys among filler rows."""
+    known = list(INFO_KEYS)
+    keys = []
+    values = []
+    for i in range(rows):
+        if i % 10 == 0:
+            keys.append(known[(i // 10) % len(known)])
+        elif i % 7 == 0:
+            keys.append(None)
+        else:
+            keys.append(f"  Note {i}  ")
+        values.append(None if i % 13 == 0 else f" value {i} ")
+    return pd.DataFrame({"Key": keys, "Value": values})
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    print(f"{'rows':>8} {'iterrows (ms)':>14} {'vectorized (ms)':>16} {'speedup':>8}")
+    for rows in args.rows:
+        df_info = make_info_frame(rows)
+        assert extract_info_from_excel(df_info) == extract_info_iterrows(df_info)
+
+        baseline = min(timeit.repeat(lambda: extract_info_iterrows(df_info), number=1, repeat=args.repeat))
+        vectorized = min(timeit.repeat(lambda: extract_info_from_excel(df_info), number=1, repeat=args.repeat))
+        print(f"{rows:>8} {baseline * 1000:>14.2f} {vectorized * 1000:>16.2f} {baseline / vectorized:>7.1f}x")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""Measure the cold start of the web app in fresh interpreter processes.
+
+Each repetition starts a new Python process, as a container restart would,
+and times:
+
+    import_streamlit   ``import streamlit``
+    first_render       first script run of app.py with no upload (the landing page)
+    import_processing  ``import processing``, which the first upload pays for
+
+It also lists the heavy modules (pandas, openpyxl, pyarrow, python_calamine)
+that the landing page loaded; the list should stay empty.
+
+Usage:
+    python benchmarks/bench_startup.py [--repeat 5] [--output startup.json]
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+APP_DIR = BENCH_DIR.parent
+
+HEAVY_MODULES = ["pandas", "openpyxl", "pyarrow", "python_calamine"]
+
+# Runs in the fresh process; prints one JSON object
+CHILD = """
+import json, logging, sys, time
+started = time.perf_counter()
+import streamlit
+from streamlit.testing.v1 import AppTest
+imported = time.perf_counter()
+logging.getLogger("streamlit").setLevel(logging.ERROR)
+at = AppTest.from_file("app.py", default_timeout=60).run()
+rendered = time.perf_counter()
+heavy = [name for name in HEAVY_MODULES if name in sys.modules]
+import processing
+loaded = time.perf_counter()
+print(json.dumps({
+    "import_streamlit": imported - started,
+    "first_render": rendered - imported,
+    "import_processing": loaded - rendered,
+    "heavy_modules": heavy,
+    "errors": [str(e.value) for e in at.exception],
+}))
+"""
+
+
+def run_once() -> dict:
+    code = f"HEAVY_MODULES = {HEAVY_MODULES!r}\n{CHILD}"
+    completed = subprocess.run(
+        [sys.executable, "-c", code], cwd=APP_DIR, capture_output=True, text=True, check=True
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", type=Path, help="Write all runs and the medians as JSON")
+    args = parser.parse_args(argv)
+
+    runs = [run_once() for _ in range(args.repeat)]
+    stages = ["import_streamlit", "first_render", "import_processing"]
+    medians = {stage: statistics.median(run[stage] for run in runs) for stage in stages}
+
+    for stage in stages:
+        best = min(run[stage] for run in runs)
+        print(f"{stage:<18} median {medians[stage] * 1000:>8.1f} ms   best {best * 1000:>8.1f} ms")
+    heavy = sorted({name for run in runs for name in run["heavy_modules"]})
+    errors = sorted({error for run in runs for error in run["errors"]})
+    print(f"heavy modules at first paint: {', '.join(heavy) or 'none'}")
+    for error in errors:
+        print(f"error: {error}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"medians_s": medians, "runs": runs}, f, indent=2)
+        print(f"Results written to {args.output}")
+    return 1 if heavy or errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""Load test for the local query API (api_server.py).
+
+Sends ``--requests`` POST /query calls from ``--concurrency`` client
+threads, either JSON ID lists or a synthetic workbook upload, and prints
+client-side throughput, latency percentiles and status counts followed by
+the server's own /stats. With ``--spawn`` a server is started on a free
+port for the duration of the run.
+
+Usage:
+    python benchmarks/load_test_api.py --spawn --mode json --ids 5000 --requests 500 --concurrency 16
+    python benchmarks/load_test_api.py --url http://127.0.0.1:8502 --mode workbook --rows 10000
+"""
+
+import argparse
+import collections
+import json
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent))
+
+from api_server import percentile  # noqa: E402
+from run_benchmarks import get_workbook_bytes  # noqa: E402
+from synthetic import DATA_COLUMNS  # noqa: E402
+
+
+def post(url: str, body: bytes, content_type: str) -> tuple:
+    """Send one request; return ``(status, seconds)``."""
+    request = urllib.request.Request(url, data=body, headers={"Content-Type": content_type}, method="POST")
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=300) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except OSError:
+        status = 0
+    return status, time.perf_counter() - started
+
+
+def wait_until_up(base_url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"{base_url}/health", timeout=1):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"API server at {base_url} did not come up")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8502", help="Base URL of a running server")
+    parser.add_argument("--spawn", action="store_true", help="Start a server on a free port for this run")
+    parser.add_argument("--workers", type=int, default=4, help="Workers of the spawned server")
+    parser.add_argument("--queue-size", type=int, default=64, help="Queue size of the spawned server")
+    parser.add_argument("--mode", choices=["json", "workbook"], default="json")
+    parser.add_argument("--type", dest="monitoring_type", choices=list(DATA_COLUMNS), default="PO_Ordering")
+    parser.add_argument("--ids", type=int, default=1000, help="IDs per JSON request")
+    parser.add_argument("--rows", type=int, default=10_000, help="Rows of the uploaded workbook")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args(argv)
+
+    if args.mode == "json":
+        prefix = "PO" if args.monitoring_type == "PO_Ordering" else "RC"
+        body = json.dumps({
+            "monitoring_type": args.monitoring_type,
+            "unique_names": [f"{prefix}{n}" for n in range(100000, 100000 + args.ids)],
+        }).encode("utf-8")
+        content_type = "application/json"
+        query_path = "/query"
+    else:
+        body = get_workbook_bytes(args.monitoring_type, args.rows, 0.3)
+        content_type = "application/octet-stream"
+        query_path = "/query?file_name=load_test.xlsx"
+
+    server = None
+    base_url = args.url.rstrip("/")
+    if args.spawn:
+        port = free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        server = subprocess.Popen([
+            sys.executable, str(BENCH_DIR.parent / "api_server.py"), "--port", str(port),
+            "--workers", str(args.workers), "--queue-size", str(args.queue_size),
+        ])
+    try:
+        wait_until_up(base_url)
+        # One warm-up request so process start-up is not counted
+        post(base_url + query_path, body, content_type)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            results = list(pool.map(
+                lambda _: post(base_url + query_path, body, content_type), range(args.requests)
+            ))
+        wall = time.perf_counter() - started
+
+        with urllib.request.urlopen(f"{base_url}/stats", timeout=10) as response:
+            server_stats = json.load(response)
+    finally:
+        if server is not None:
+            # SIGINT lets the server shut its parse processes down cleanly
+            server.send_signal(signal.SIGINT)
+            server.wait()
+
+    statuses = collections.Counter(status for status, _ in results)
+    latencies = sorted(seconds for _, seconds in results)
+    print(f"{args.requests} {args.mode} requests, concurrency {args.concurrency}, body {len(body) / 1024:.0f} KB")
+    print(f"  wall time   {wall:.2f} s, {args.requests / wall:.1f} requests/s")
+    print(f"  latency ms  p50 {percentile(latencies, 0.5) * 1000:.1f}  p95 {percentile(latencies, 0.95) * 1000:.1f}  "
+          f"p99 {percentile(latencies, 0.99) * 1000:.1f}  max {latencies[-1] * 1000:.1f}")
+    print(f"  statuses    {dict(sorted(statuses.items()))}")
+    print(f"server /stats {json.dumps(server_stats)}")
+    return 0 if set(statuses) == {200} else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,198 @@
+"""Benchmark the parsing and query stages on synthetic workbooks.
+
+Each case (monitoring type x rows x duplicate ratio) times these stages
+separately, keeping the best of ``--repeat`` runs:
+
+    detect_monitoring_type   full eager parse of Info and data sheets
+    extract_info_from_excel  Info dict from the parsed Info frame
+    unique_dedupe_pandas     df["UniqueName"].dropna().unique()
+    unique_dedupe_streaming  extract_unique_names_streaming() on the workbook
+    generate_query           generate_po_ordering_query / generate_rc_processing_query
+    generate_query_compact   the same query with runs of consecutive IDs compacted to ranges
+    summary_analytics        summarize_report() breakdowns of the data sheet
+
+Results are written as JSON. With ``--baseline`` the run is compared with an
+earlier result file and exits with status 1 when any stage got slower than
+``--threshold`` allows.
+
+Usage:
+    python benchmarks/run_benchmarks.py --sizes 100 10000 100000 --output bench.json
+    python benchmarks/run_benchmarks.py --baseline bench.json --threshold 0.2
+"""
+
+import argparse
+import datetime
+import io
+import json
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import openpyxl
+import pandas as pd
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent))
+
+from processing import (  # noqa: E402
+    QUERY_TEMPLATES,
+    compact_query,
+    detect_monitoring_type,
+    extract_info_from_excel,
+    extract_unique_names_streaming,
+    get_query_builder,
+    has_query_support,
+    render_query,
+    summarize_report,
+)
+from synthetic import DATA_COLUMNS, generate_workbook  # noqa: E402
+
+DATA_DIR = BENCH_DIR / ".data"
+
+
+def best_time(func, repeat: int):
+    """Run ``func`` ``repeat`` times; return the fastest wall time and the last result."""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def get_workbook_bytes(monitoring_type: str, rows: int, duplicate_ratio: float) -> bytes:
+    """Generate a synthetic workbook once and reuse it from ``.data/`` afterwards."""
+    path = DATA_DIR / f"{monitoring_type}-{rows}-{duplicate_ratio:g}.xlsx"
+    if not path.exists():
+        print(f"  generating {path.name} ...", file=sys.stderr)
+        generate_workbook(path, monitoring_type, rows, duplicate_ratio)
+    return path.read_bytes()
+
+
+def run_case(monitoring_type: str, rows: int, duplicate_ratio: float, repeat: int) -> dict:
+    """Time every stage for one synthetic workbook."""
+    data = get_workbook_bytes(monitoring_type, rows, duplicate_ratio)
+    timings = {}
+
+    timings["detect_monitoring_type"], (detected_type, df_info, df_data) = best_time(
+        lambda: detect_monitoring_type(io.BytesIO(data)), repeat
+    )
+    timings["extract_info_from_excel"], _ = best_time(lambda: extract_info_from_excel(df_info), repeat)
+    timings["unique_dedupe_pandas"], unique_names = best_time(
+        lambda: df_data["UniqueName"].dropna().unique().tolist(), repeat
+    )
+    timings["unique_dedupe_streaming"], streamed_names = best_time(
+        lambda: extract_unique_names_streaming(io.BytesIO(data), detected_type), repeat
+    )
+    if streamed_names != unique_names:
+        raise AssertionError(f"Streaming dedupe differs from pandas for {monitoring_type} / {rows} rows")
+    timings["summary_analytics"], _ = best_time(lambda: summarize_report(df_data, detected_type), repeat)
+
+    query_sizes = {}
+    if has_query_support(detected_type):
+        query_builder = get_query_builder(detected_type)
+        template = QUERY_TEMPLATES[detected_type]
+        timings["generate_query"], query = best_time(lambda: query_builder(unique_names), repeat)
+        timings["generate_query_compact"], compact = best_time(
+            lambda: render_query(*compact_query(template, unique_names)), repeat
+        )
+        query_sizes = {"plain": len(query.encode("utf-8")), "compact": len(compact.encode("utf-8"))}
+
+    return {
+        "case": f"{monitoring_type}-rows{rows}-dup{duplicate_ratio:g}",
+        "monitoring_type": monitoring_type,
+        "rows": rows,
+        "duplicate_ratio": duplicate_ratio,
+        "unique_names": len(unique_names),
+        "file_bytes": len(data),
+        "query_bytes": query_sizes,
+        "timings_s": timings,
+    }
+
+
+def get_git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BENCH_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_with_baseline(results: list, baseline: dict, threshold: float) -> list:
+    """Return one line per stage that is slower than the baseline beyond ``threshold``."""
+    baseline_cases = {case["case"]: case["timings_s"] for case in baseline["results"]}
+    regressions = []
+    for case in results:
+        previous = baseline_cases.get(case["case"])
+        if previous is None:
+            continue
+        for stage, seconds in case["timings_s"].items():
+            before = previous.get(stage)
+            if before and seconds > before * (1 + threshold):
+                regressions.append(
+                    f"{case['case']} {stage}: {before * 1000:.1f} ms -> {seconds * 1000:.1f} ms "
+                    f"(+{(seconds / before - 1) * 100:.0f}%)"
+                )
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark workbook parsing and query generation.")
+    parser.add_argument("--types", nargs="+", default=list(DATA_COLUMNS), choices=list(DATA_COLUMNS))
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10_000, 100_000],
+                        help="Data sheet row counts (up to 1000000)")
+    parser.add_argument("--duplicates", type=float, nargs="+", default=[0.0, 0.5],
+                        help="Shares of rows repeating an earlier UniqueName")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", type=Path, default=Path("bench_results.json"))
+    parser.add_argument("--baseline", type=Path, help="Earlier result file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Allowed slowdown against the baseline (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    results = []
+    for monitoring_type in args.types:
+        for rows in args.sizes:
+            for duplicate_ratio in args.duplicates:
+                case = run_case(monitoring_type, rows, duplicate_ratio, args.repeat)
+                results.append(case)
+                stages = ", ".join(f"{stage} {seconds * 1000:.1f} ms" for stage, seconds in case["timings_s"].items())
+                print(f"{case['case']}: {stages}")
+
+    report = {
+        "meta": {
+            "commit": get_git_commit(),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "openpyxl": openpyxl.__version__,
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(results, baseline, args.threshold)
+        if regressions:
+            print(f"Regressions beyond {args.threshold:.0%} against {args.baseline}:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
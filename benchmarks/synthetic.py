@@ -0,0 +1,125 @@
+"""Synthetic monitoring workbooks for benchmarks.
+
+Builds PO_Ordering, RC_Processing or unknown-type workbooks with an Info
+sheet and a data sheet of any size, with a configurable share of repeated
+UniqueNames.
+
+Usage:
+    python benchmarks/synthetic.py OUT.xlsx --type PO_Ordering --rows 100000 --duplicates 0.3
+"""
+
+import argparse
+import datetime
+import random
+import sys
+from pathlib import Path
+
+import openpyxl
+
+UNKNOWN_TYPE = "Invoice_Exceptions"
+
+DATA_COLUMNS = {
+    "PO_Ordering": [
+        "UniqueName", "OrderID", "Name", "StatusString", "Recipients.OrderingMethod",
+        "Recipients.FailureReason", "Supplier.Name", "TimeCreated", "Realm",
+    ],
+    "RC_Processing": [
+        "UniqueName", "StatusString", "CreateDate", "ApprovedDate", "Supplier.Name", "Realm",
+    ],
+    UNKNOWN_TYPE: [
+        "UniqueName", "StatusString", "Supplier.Name", "TimeCreated", "Realm",
+    ],
+}
+
+ID_PREFIXES = {"PO_Ordering": "PO", "RC_Processing": "RC", UNKNOWN_TYPE: "INV"}
+
+STATUSES = ["Ordering", "Ordered", "Failed", "Approved", "Composing"]
+ORDERING_METHODS = ["cXML", "Email", "Fax", "Print"]
+FAILURE_REASONS = [None, None, None, "Timeout", "Supplier rejected", "Invalid address"]
+SUPPLIERS = [f"Supplier {i:03d}" for i in range(250)]
+REALMS = ["acme-T", "acme-child-T"]
+
+
+def iter_unique_names(monitoring_type: str, rows: int, duplicate_ratio: float, rng: random.Random):
+    """Yield ``rows`` IDs of which about ``duplicate_ratio`` repeat an earlier one."""
+    prefix = ID_PREFIXES[monitoring_type]
+    issued = 0
+    for _ in range(rows):
+        if issued and rng.random() < duplicate_ratio:
+            yield f"{prefix}{10000 + rng.randrange(issued)}"
+        else:
+            yield f"{prefix}{10000 + issued}"
+            issued += 1
+
+
+def make_row(monitoring_type: str, unique_name: str, rng: random.Random) -> list:
+    base = datetime.datetime(2025, 1, 1)
+    created = base + datetime.timedelta(minutes=rng.randrange(500_000))
+    values = {
+        "UniqueName": unique_name,
+        "OrderID": f"45{rng.randrange(10**8):08d}",
+        "Name": f"Order {unique_name}",
+        "StatusString": rng.choice(STATUSES),
+        "Recipients.OrderingMethod": rng.choice(ORDERING_METHODS),
+        "Recipients.FailureReason": rng.choice(FAILURE_REASONS),
+        "Supplier.Name": rng.choice(SUPPLIERS),
+        "TimeCreated": created,
+        "CreateDate": created,
+        "ApprovedDate": created + datetime.timedelta(hours=rng.randrange(1, 200)),
+        "Realm": rng.choice(REALMS),
+    }
+    return [values[column] for column in DATA_COLUMNS[monitoring_type]]
+
+
+def generate_workbook(path, monitoring_type: str = "PO_Ordering", rows: int = 1000,
+                      duplicate_ratio: float = 0.0, info_rows: int = 0, seed: int = 0) -> Path:
+    """Write a synthetic monitoring workbook and return its path.
+
+    ``info_rows`` adds filler rows to the Info sheet, like merged templates do.
+    """
+    if monitoring_type not in DATA_COLUMNS:
+        raise ValueError(f"Unknown monitoring type: {monitoring_type}")
+
+    rng = random.Random(seed)
+    wb = openpyxl.Workbook(write_only=True)
+
+    info = wb.create_sheet("Info")
+    info.append(["Key", "Value"])
+    info.append(["Realm", REALMS[0]])
+    info.append(["Realms", ", ".join(REALMS)])
+    info.append(["PSEE Consultant", "Synthetic Consultant"])
+    info.append(["Monitoring Contacts", "ops@example.com, buyer@example.com"])
+    info.append(["Monitoring", monitoring_type])
+    info.append(["Customer Account Name", "Synthetic Customer"])
+    info.append(["Data Center", "EU2"])
+    for i in range(info_rows):
+        info.append([f"Note {i}", f"Filler value {i}"])
+
+    data = wb.create_sheet(monitoring_type)
+    data.append(DATA_COLUMNS[monitoring_type])
+    for unique_name in iter_unique_names(monitoring_type, rows, duplicate_ratio, rng):
+        data.append(make_row(monitoring_type, unique_name, rng))
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    wb.save(path)
+    return path
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Generate a synthetic monitoring workbook.")
+    parser.add_argument("output", type=Path)
+    parser.add_argument("--type", default="PO_Ordering", choices=list(DATA_COLUMNS))
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--duplicates", type=float, default=0.0, help="Share of rows repeating an earlier ID (0-1)")
+    parser.add_argument("--info-rows", type=int, default=0, help="Extra filler rows in the Info sheet")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    generate_workbook(args.output, args.type, args.rows, args.duplicates, args.info_rows, args.seed)
+    print(f"Wrote {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+"""Opt-in per-stage timing and memory instrumentation.
+
+A disabled ``StageRecorder`` hands out one shared no-op context, so the
+instrumented code paths cost a method call and nothing else. When enabled,
+each stage records wall time, peak Python memory (via ``tracemalloc``) and
+an optional row count. Tracing runs only while at least one enabled
+recorder is open, because ``tracemalloc`` slows down every allocation in
+the process.
+"""
+
+import datetime
+import json
+import threading
+import time
+import tracemalloc
+from typing import Optional
+
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+
+
+def _acquire_tracing():
+    global _tracing_users
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        _tracing_users += 1
+
+
+def _release_tracing():
+    global _tracing_users
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0 and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+class StageRecord:
+    """Measurements of one stage; ``rows`` may be set inside the ``with`` block."""
+
+    __slots__ = ("name", "seconds", "peak_bytes", "rows", "cached")
+
+    def __init__(self, name: str, cached: bool = False):
+        self.name = name
+        self.seconds = 0.0
+        self.peak_bytes = 0
+        self.rows: Optional[int] = None
+        self.cached = cached
+
+    def to_dict(self) -> dict:
+        return {
+            "stage": self.name,
+            "seconds": self.seconds,
+            "peak_mb": self.peak_bytes / (1024 * 1024),
+            "rows": self.rows,
+            "cached": self.cached,
+        }
+
+
+class _NullStage:
+    """Shared no-op stage used while instrumentation is off."""
+
+    _record = StageRecord("disabled")
+
+    def __enter__(self) -> StageRecord:
+        return self._record
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    def __init__(self, recorder: "StageRecorder", name: str, cached: bool):
+        self._recorder = recorder
+        self._record = StageRecord(name, cached)
+
+    def __enter__(self) -> StageRecord:
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            self._start_bytes = tracemalloc.get_traced_memory()[0]
+        self._started = time.perf_counter()
+        return self._record
+
+    def __exit__(self, *exc_info):
+        self._record.seconds = time.perf_counter() - self._started
+        if tracemalloc.is_tracing():
+            self._record.peak_bytes = max(tracemalloc.get_traced_memory()[1] - self._start_bytes, 0)
+        self._recorder.records.append(self._record)
+        return False
+
+
+class StageRecorder:
+    """Collects a ``StageRecord`` per instrumented stage of one script run.
+
+    Stages are expected to be sequential rather than nested, since peak
+    memory is reset at the start of each stage.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.records = []
+        self.total_seconds: Optional[float] = None
+        self._started = time.perf_counter()
+        self._closed = not enabled
+        if enabled:
+            _acquire_tracing()
+
+    def stage(self, name: str, cached: bool = False):
+        """Context manager timing ``name``; ``cached`` marks a result served from cache."""
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name, cached)
+
+    def close(self):
+        """Record the total time and stop memory tracing for this recorder (idempotent)."""
+        if not self._closed:
+            self._closed = True
+            self.total_seconds = time.perf_counter() - self._started
+            _release_tracing()
+
+    def to_rows(self) -> list:
+        return [record.to_dict() for record in self.records]
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "total_seconds": self.total_seconds,
+            "stages": self.to_rows(),
+        }, indent=2)
@@ -0,0 +1,181 @@
+"""Local SQLite history of the IDs in every processed report.
+
+Each report is stored once per content hash, realm and monitoring type.
+Its IDs are upserted into ``ids``, which keeps the first and last time every
+ID was seen and the number of reports it appeared in, so lookups by ID and
+"chronic" queries are single index probes however many reports have been
+recorded. ``report_ids`` links IDs to reports for drill-downs.
+
+Usage:
+    python id_history.py lookup PO12345 --realm acme-T --type PO_Ordering
+    python id_history.py chronic --realm acme-T --type PO_Ordering [--min-reports 5]
+"""
+
+import argparse
+import contextlib
+import datetime
+import os
+import sqlite3
+import sys
+from pathlib import Path
+from typing import Iterable, Optional
+
+# Set POM_HISTORY_ENABLED=0 to stop recording processed reports
+HISTORY_ENABLED = os.environ.get("POM_HISTORY_ENABLED", "1") == "1"
+HISTORY_DB = Path(os.environ.get("POM_HISTORY_DB", Path.home() / ".pom" / "history.sqlite3"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    id INTEGER PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    realm TEXT NOT NULL,
+    monitoring_type TEXT NOT NULL,
+    file_name TEXT,
+    recorded_at TEXT NOT NULL,
+    id_count INTEGER NOT NULL,
+    recurring_count INTEGER NOT NULL,
+    UNIQUE (content_hash, realm, monitoring_type)
+);
+CREATE TABLE IF NOT EXISTS ids (
+    id INTEGER PRIMARY KEY,
+    realm TEXT NOT NULL,
+    monitoring_type TEXT NOT NULL,
+    unique_name TEXT NOT NULL,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    report_count INTEGER NOT NULL,
+    UNIQUE (realm, monitoring_type, unique_name)
+);
+CREATE INDEX IF NOT EXISTS ids_report_count ON ids (realm, monitoring_type, report_count);
+CREATE TABLE IF NOT EXISTS report_ids (
+    id_ref INTEGER NOT NULL REFERENCES ids (id),
+    report_id INTEGER NOT NULL REFERENCES reports (id),
+    PRIMARY KEY (id_ref, report_id)
+) WITHOUT ROWID;
+"""
+
+
+class IdHistory:
+    """Handle on the history database; every call opens its own connection."""
+
+    def __init__(self, path: Path = HISTORY_DB):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with contextlib.closing(self.connect()) as conn:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.executescript(SCHEMA)
+
+    def connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        # WAL keeps readers unblocked by the writer; NORMAL sync is safe with WAL
+        conn.execute("PRAGMA synchronous = NORMAL")
+        return conn
+
+    def record(self, realm: str, monitoring_type: str, content_hash: str, unique_names: Iterable,
+               file_name: Optional[str] = None) -> int:
+        """Store a report and its IDs in one transaction; return its recurring ID count.
+
+        IDs count as recurring when an earlier report of the same realm and
+        type contained them. Recording the same content again is a no-op that
+        returns the stored count.
+        """
+        realm = realm or ""
+        now = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        with contextlib.closing(self.connect()) as conn, conn:
+            # Take the write lock before the existence check, so that writers of the
+            # same report wait for each other instead of racing to insert it
+            conn.execute("BEGIN IMMEDIATE")
+            existing = conn.execute(
+                "SELECT recurring_count FROM reports WHERE content_hash = ? AND realm = ? AND monitoring_type = ?",
+                (content_hash, realm, monitoring_type),
+            ).fetchone()
+            if existing is not None:
+                return existing["recurring_count"]
+
+            conn.execute("CREATE TEMP TABLE incoming (unique_name TEXT PRIMARY KEY) WITHOUT ROWID")
+            conn.executemany(
+                "INSERT OR IGNORE INTO incoming VALUES (?)",
+                ((str(name),) for name in unique_names),
+            )
+            id_count, recurring_count = conn.execute(
+                """SELECT count(*), count(ids.id) FROM incoming
+                   LEFT JOIN ids ON ids.realm = ? AND ids.monitoring_type = ?
+                                AND ids.unique_name = incoming.unique_name""",
+                (realm, monitoring_type),
+            ).fetchone()
+
+            report_id = conn.execute(
+                """INSERT INTO reports (content_hash, realm, monitoring_type, file_name,
+                                        recorded_at, id_count, recurring_count)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                (content_hash, realm, monitoring_type, file_name, now, id_count, recurring_count),
+            ).lastrowid
+            conn.execute(
+                """INSERT INTO ids (realm, monitoring_type, unique_name, first_seen, last_seen, report_count)
+                   SELECT ?, ?, unique_name, ?, ?, 1 FROM incoming WHERE true
+                   ON CONFLICT (realm, monitoring_type, unique_name)
+                   DO UPDATE SET last_seen = excluded.last_seen, report_count = report_count + 1""",
+                (realm, monitoring_type, now, now),
+            )
+            conn.execute(
+                """INSERT INTO report_ids (id_ref, report_id)
+                   SELECT ids.id, ? FROM incoming
+                   JOIN ids ON ids.realm = ? AND ids.monitoring_type = ?
+                           AND ids.unique_name = incoming.unique_name""",
+                (report_id, realm, monitoring_type),
+            )
+            conn.execute("DROP TABLE incoming")
+        return recurring_count
+
+    def lookup(self, realm: str, monitoring_type: str, unique_name) -> Optional[dict]:
+        """First and last sighting and report count of one ID, or None if never seen."""
+        with contextlib.closing(self.connect()) as conn:
+            row = conn.execute(
+                """SELECT unique_name, first_seen, last_seen, report_count FROM ids
+                   WHERE realm = ? AND monitoring_type = ? AND unique_name = ?""",
+                (realm or "", monitoring_type, str(unique_name)),
+            ).fetchone()
+        return dict(row) if row is not None else None
+
+    def chronic_ids(self, realm: str, monitoring_type: str, min_reports: int = 2, limit: int = 100) -> list:
+        """IDs that appeared in at least ``min_reports`` reports, most frequent first."""
+        with contextlib.closing(self.connect()) as conn:
+            rows = conn.execute(
+                """SELECT unique_name, first_seen, last_seen, report_count FROM ids
+                   WHERE realm = ? AND monitoring_type = ? AND report_count >= ?
+                   ORDER BY report_count DESC LIMIT ?""",
+                (realm or "", monitoring_type, min_reports, limit),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Query the local history of processed report IDs.")
+    parser.add_argument("command", choices=["lookup", "chronic"])
+    parser.add_argument("unique_name", nargs="?", help="ID to look up")
+    parser.add_argument("--realm", default="")
+    parser.add_argument("--type", dest="monitoring_type", default="PO_Ordering")
+    parser.add_argument("--min-reports", type=int, default=2)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--db", type=Path, default=HISTORY_DB)
+    args = parser.parse_args(argv)
+
+    history = IdHistory(args.db)
+    if args.command == "lookup":
+        if args.unique_name is None:
+            parser.error("lookup needs an ID")
+        row = history.lookup(args.realm, args.monitoring_type, args.unique_name)
+        if row is None:
+            print(f"{args.unique_name} has not been seen")
+            return 1
+        print(f"{row['unique_name']}: in {row['report_count']} reports, "
+              f"first seen {row['first_seen']}, last seen {row['last_seen']}")
+    else:
+        for row in history.chronic_ids(args.realm, args.monitoring_type, args.min_reports, args.limit):
+            print(f"{row['unique_name']}\t{row['report_count']}\t{row['first_seen']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
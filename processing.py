@@ -0,0 +1,1446 @@
+"""Monitoring workbook parsing and AQL query generation.
+
+Everything here is free of Streamlit so that the web app, command-line
+tools and background workers can share it.
+"""
+
+import csv
+import functools
+import gzip
+import hashlib
+import importlib.util
+import io
+import itertools
+import math
+import os
+import re
+import sys
+import threading
+import zipfile
+from concurrent.futures import Executor
+from typing import Callable, Iterable, Iterator, Tuple, Optional
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+from sheet_cache import SheetCache, get_default_sheet_cache
+
+
+# Default AQL batch limits; 0 disables a limit.
+QUERY_BATCH_MAX_IDS = int(os.environ.get("POM_QUERY_BATCH_MAX_IDS", "1000"))
+QUERY_BATCH_MAX_BYTES = int(os.environ.get("POM_QUERY_BATCH_MAX_BYTES", "0"))
+
+# Text columns whose distinct values are at most this share of the rows are
+# stored as categoricals; 0 turns the conversion off.
+CATEGORY_MAX_RATIO = float(os.environ.get("POM_CATEGORY_MAX_RATIO", "0.5"))
+
+# Rows per chunk when reading IDs from CSV/TSV exports
+CSV_CHUNK_ROWS = int(os.environ.get("POM_CSV_CHUNK_ROWS", "100000"))
+
+# Rows between progress updates (and cancellation checks) of a streamed sheet
+PROGRESS_EVERY_ROWS = 10000
+
+# Rows of other columns the streamed ID pass buffers before handing them on
+SCAN_CHUNK_ROWS = 2000
+
+# Cell texts that pd.read_excel reads as missing (its default na_values)
+NA_STRINGS = frozenset({
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+})
+
+
+# Excel reader: "auto" uses calamine when python-calamine is installed and
+# falls back to openpyxl; "calamine" or "openpyxl" force one of them. The ID
+# pass streams xlsx sheets with openpyxl unless "calamine" is set explicitly.
+EXCEL_ENGINE = os.environ.get("POM_EXCEL_ENGINE", "auto")
+EXCEL_ENGINES = ("auto", "calamine", "openpyxl")
+
+
+@functools.lru_cache(maxsize=None)
+def get_excel_engine(setting: str = EXCEL_ENGINE) -> Optional[str]:
+    """Resolve an engine setting to the ``engine`` argument of ``pd.read_excel``.
+    
+    Returns "calamine" or None, which leaves the choice to pandas (openpyxl
+    for xlsx, xlrd for legacy xls). Both engines produce identical frames.
+    """
+    if setting not in EXCEL_ENGINES:
+        raise ValueError(f"Unknown Excel engine {setting!r}; expected one of {', '.join(EXCEL_ENGINES)}")
+    has_calamine = importlib.util.find_spec("python_calamine") is not None
+    if setting == "calamine" and not has_calamine:
+        raise ImportError("The calamine Excel engine requires the python-calamine package")
+    if setting != "openpyxl" and has_calamine:
+        return "calamine"
+    return None
+
+
+# Exceptions the readers raise for uploads that are not a readable report, as
+# opposed to faults of the environment
+REPORT_READ_ERRORS = (
+    ValueError,
+    KeyError,
+    EOFError,
+    zipfile.BadZipFile,
+    gzip.BadGzipFile,
+    openpyxl.utils.exceptions.InvalidFileException,
+)
+if importlib.util.find_spec("python_calamine") is not None:
+    from python_calamine import CalamineError
+    REPORT_READ_ERRORS += (CalamineError,)
+
+
+# Info sheet key -> info dict field. Add a line here to pick up a new key.
+INFO_KEYS = {
+    "Realm": "realm",
+    "Realms": "realms",
+    "PSEE Consultant": "product_specialist",
+    "Monitoring Contacts": "customer_contacts",
+    "Monitoring": "monitoring_type",
+    "Customer Account Name": "customer_name",
+    "Data Center": "data_center",
+}
+
+
+def read_info_sheet(excel_file) -> pd.DataFrame:
+    """Read only the key and value columns (A:B) of the Info sheet.
+    
+    An Info sheet with fewer than two columns has no values and reads as an
+    empty frame.
+    """
+    try:
+        return pd.read_excel(excel_file, sheet_name="Info", usecols="A:B", engine=get_excel_engine())
+    except pd.errors.ParserError:
+        # usecols refuses columns beyond the last one in use
+        return pd.DataFrame()
+
+
+def extract_info_from_excel(df_info: pd.DataFrame) -> dict:
+    """Extract metadata from the Info sheet.
+    
+    Keys in the first column are mapped through ``INFO_KEYS`` in one
+    vectorized pass; when a key repeats, the last row wins. A sheet without
+    both a key and a value column yields an empty dict.
+    """
+    if df_info.shape[1] < 2:
+        return {}
+    keys = df_info.iloc[:, 0]
+    values = df_info.iloc[:, 1]
+    
+    fields = keys.where(keys.notna(), "").astype(str).str.strip().map(INFO_KEYS)
+    values = values.where(values.notna(), "").astype(str).str.strip()
+    
+    known = fields.notna()
+    return dict(zip(fields[known], values[known]))
+
+
+def resolve_data_sheet(sheet_names: list) -> Optional[str]:
+    """Pick the data sheet of a monitoring workbook; its name is the monitoring type."""
+    # Check for known query types first
+    if "PO_Ordering" in sheet_names:
+        return "PO_Ordering"
+    if "RC_Processing" in sheet_names:
+        return "RC_Processing"
+    # For other types, find the data sheet (any sheet that's not "Info")
+    data_sheets = [s for s in sheet_names if s != "Info"]
+    if data_sheets:
+        return data_sheets[0]
+    return None
+
+
+def detect_monitoring_type(excel_file) -> Tuple[str, Optional[pd.DataFrame], Optional[pd.DataFrame]]:
+    """Detect the monitoring type from the Excel file."""
+    xl = pd.ExcelFile(excel_file, engine=get_excel_engine())
+    sheet_names = xl.sheet_names
+    
+    df_info = None
+    df_data = None
+    
+    if "Info" in sheet_names:
+        df_info = read_info_sheet(xl)
+    
+    monitoring_type = resolve_data_sheet(sheet_names)
+    if monitoring_type is not None:
+        df_data = pd.read_excel(xl, sheet_name=monitoring_type)
+    
+    return monitoring_type, df_info, df_data
+
+
+def get_content_hash(data: bytes) -> str:
+    """Return a stable hash of the uploaded file content."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def is_xlsx_file(excel_file) -> bool:
+    """Check whether the file is an OOXML workbook (xlsx) rather than legacy xls."""
+    is_xlsx = zipfile.is_zipfile(excel_file)
+    excel_file.seek(0)
+    return is_xlsx
+
+
+class ParseCancelled(Exception):
+    """Raised inside a parse whose ParseProgress has been cancelled."""
+
+
+class ParseProgress:
+    """Rows read so far by a parse running on another thread, and a way to stop it.
+    
+    Readers call ``advance`` as they go; once ``cancel`` has been called it
+    raises ParseCancelled, so a superseded parse stops at its next batch of
+    rows. ``total_rows`` is filled in when the reader knows the sheet size.
+    """
+    
+    def __init__(self):
+        self.rows_read = 0
+        self.total_rows = None
+        self._cancelled = threading.Event()
+    
+    def advance(self, rows: int):
+        self.rows_read += rows
+        self.check()
+    
+    def check(self):
+        if self._cancelled.is_set():
+            raise ParseCancelled()
+    
+    def cancel(self):
+        self._cancelled.set()
+    
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+    
+    @property
+    def fraction(self) -> Optional[float]:
+        """Share of the rows read, or None while the total is unknown."""
+        if not self.total_rows:
+            return None
+        return min(1.0, self.rows_read / self.total_rows)
+
+
+def extract_unique_names_streaming(excel_file, sheet_name: str, column: str = "UniqueName",
+                                   progress: Optional[ParseProgress] = None, row_columns: Iterable = (),
+                                   on_rows: Optional[Callable[[pd.DataFrame], None]] = None) -> Optional[list]:
+    """Stream one column of a data sheet and dedupe its values in first-seen order.
+    
+    The sheet is read row by row in openpyxl read-only mode, so memory grows
+    with the number of distinct IDs rather than with the sheet size. Cell
+    values are converted the way ``pd.read_excel`` converts them, which keeps
+    the result identical to ``df[column].dropna().unique().tolist()``.
+    Returns None when the sheet has no ``column`` header. ``progress``, if
+    given, is advanced every ``PROGRESS_EVERY_ROWS`` rows.
+    
+    The same pass can hand other columns to ``on_rows``: the ``row_columns``
+    found in the header are passed on in frames of up to ``SCAN_CHUNK_ROWS``
+    rows, with missing markers as None, and are not kept afterwards. Blank
+    rows count only when a filled row follows them, as with
+    ``pd.read_excel``. They are passed on even without a ``column`` header.
+    """
+    wb = openpyxl.load_workbook(excel_file, read_only=True, data_only=True, keep_links=False)
+    try:
+        ws = wb[sheet_name]
+        if progress is not None and ws.max_row:
+            # The stored dimension is only a hint; the rows themselves decide
+            progress.total_rows = ws.max_row - 1
+        ws.reset_dimensions()
+        rows = ws.iter_rows(values_only=True)
+        
+        header = next(rows, None)
+        if header is None:
+            return None
+        col_idx = header.index(column) if column in header else None
+        row_indexes = {name: header.index(name) for name in row_columns if name in header} if on_rows else {}
+        if col_idx is None and not row_indexes:
+            return None
+        row_values = {name: [] for name in row_indexes}
+        buffered_rows = 0
+        blank_rows = 0
+        
+        seen = {}
+        has_missing = False
+        has_float = False
+        all_numeric = True
+        for row_number, row in enumerate(rows, 1):
+            if progress is not None and row_number % PROGRESS_EVERY_ROWS == 0:
+                progress.advance(PROGRESS_EVERY_ROWS)
+            if row_indexes:
+                if all(cell is None for cell in row):
+                    blank_rows += 1
+                    has_missing = True
+                    continue
+                for name, index in row_indexes.items():
+                    cell = row[index] if index < len(row) else None
+                    if isinstance(cell, str) and cell in NA_STRINGS or isinstance(cell, float) and math.isnan(cell):
+                        cell = None
+                    row_values[name].extend([None] * blank_rows)
+                    row_values[name].append(cell)
+                buffered_rows += blank_rows + 1
+                blank_rows = 0
+                if buffered_rows >= SCAN_CHUNK_ROWS:
+                    on_rows(pd.DataFrame(row_values))
+                    row_values = {name: [] for name in row_indexes}
+                    buffered_rows = 0
+            if col_idx is None:
+                continue
+            value = row[col_idx] if col_idx < len(row) else None
+            if isinstance(value, str):
+                if value in NA_STRINGS:
+                    has_missing = True
+                    continue
+                all_numeric = False
+            elif isinstance(value, float):
+                if math.isnan(value):
+                    has_missing = True
+                    continue
+                if value.is_integer():
+                    value = int(value)
+                else:
+                    has_float = True
+            elif value is None:
+                has_missing = True
+                continue
+            elif isinstance(value, bool) or not isinstance(value, int):
+                all_numeric = False
+            seen[value] = None
+        if buffered_rows:
+            on_rows(pd.DataFrame(row_values))
+    finally:
+        wb.close()
+    
+    if col_idx is None:
+        return None
+    unique_names = list(seen)
+    # pandas stores a numeric column with gaps or fractions as float64
+    if all_numeric and (has_missing or has_float):
+        unique_names = list(dict.fromkeys(float(value) for value in unique_names))
+    return unique_names
+
+
+def optimize_frame_memory(df: pd.DataFrame, max_category_ratio: float = CATEGORY_MAX_RATIO,
+                          keep: tuple = ("UniqueName",)) -> pd.DataFrame:
+    """Shrink a parsed sheet in place without changing any value.
+    
+    Repetitive text columns (statuses, ordering methods, supplier names)
+    become categoricals, integers are downcast to the smallest type that
+    holds them and floats to float32 where that is lossless. Columns in
+    ``keep`` are left alone so that IDs keep their dtype.
+    """
+    for column in df.columns:
+        if column in keep:
+            continue
+        values = df[column]
+        if isinstance(values.dtype, pd.CategoricalDtype) or pd.api.types.is_bool_dtype(values.dtype):
+            continue
+        if pd.api.types.is_integer_dtype(values.dtype):
+            df[column] = pd.to_numeric(values, downcast="integer")
+        elif pd.api.types.is_float_dtype(values.dtype):
+            downcast = values.astype("float32")
+            if ((downcast.astype(values.dtype) == values) | values.isna()).all():
+                df[column] = downcast
+        elif pd.api.types.is_object_dtype(values.dtype) or pd.api.types.is_string_dtype(values.dtype):
+            if len(values) and values.nunique(dropna=True) <= max_category_ratio * len(values):
+                df[column] = values.astype("category")
+    return df
+
+
+# Sheet cache part holding a released upload
+UPLOAD_PART = "upload"
+
+
+def estimate_object_size(values: list) -> int:
+    """Approximate bytes held by a list and the objects in it."""
+    return sys.getsizeof(values) + sum(sys.getsizeof(value) for value in values)
+
+
+class LazyWorkbook:
+    """Handle on an uploaded workbook that reads each part only when first needed.
+    
+    Sheet names and the data sheet header are available right away. The Info
+    dict, the deduplicated UniqueNames and the full data frame are loaded on
+    first access and memoized on the handle, so a shared handle pays for each
+    of them at most once. Parsed sheets also go to the disk ``sheet_cache``
+    (the environment's default unless given), so a re-upload of the same
+    content skips the XML parse even in a new process.
+    """
+    
+    def __init__(self, file_bytes: bytes, content_hash: Optional[str] = None,
+                 sheet_cache: Optional[SheetCache] = None, file_name: Optional[str] = None):
+        self._file_bytes = file_bytes
+        self.file_size = len(file_bytes)
+        self.file_name = file_name
+        self.content_hash = content_hash or get_content_hash(file_bytes)
+        self.sheet_cache = sheet_cache or get_default_sheet_cache()
+        self._memo = {}
+        self._sizes = {}
+        self._locks = {}
+        self._read_layout()
+    
+    def _read_layout(self):
+        """Set the sheet names, the data sheet and the monitoring type."""
+        self.is_xlsx = is_xlsx_file(self._open())
+        with pd.ExcelFile(self._open(), engine=get_excel_engine()) as xl:
+            self.sheet_names = xl.sheet_names
+        self.data_sheet = resolve_data_sheet(self.sheet_names)
+        # The data sheet name doubles as the monitoring type
+        self.monitoring_type = self.data_sheet
+    
+    def _open(self) -> io.BytesIO:
+        # Read once: another session may release the bytes at any time
+        data = self._file_bytes
+        if data is None:
+            # Released uploads are read back from the sheet cache
+            data = self.sheet_cache.load_bytes(self.content_hash, UPLOAD_PART) if self.sheet_cache is not None else None
+        if data is None:
+            raise RuntimeError("The uploaded file was released from memory; please upload it again.")
+        return io.BytesIO(data)
+    
+    def release_file_bytes(self) -> bool:
+        """Drop the raw upload once the header, Info and IDs are loaded; return whether it is gone.
+        
+        The upload is written to the sheet cache first, so parts loaded later
+        (such as ``df_data``) are read from there. Without a sheet cache it
+        stays in memory until ``df_data`` has been loaded as well.
+        """
+        data = self._file_bytes
+        if data is None:
+            return True
+        if not all(self.is_loaded(key) for key in ("columns", "info", "unique_names")):
+            return False
+        if not self.is_loaded("df_data") and (
+            self.sheet_cache is None
+            or not self.sheet_cache.store_bytes(self.content_hash, UPLOAD_PART, data)
+        ):
+            return False
+        self._file_bytes = None
+        return True
+    
+    def restore_file_bytes(self, file_bytes: bytes):
+        """Hold a released upload in memory again, given the same content uploaded anew.
+        
+        The sheet cache may have pruned its copy since ``release_file_bytes``,
+        which would leave the handle unable to read anything it has not loaded
+        yet. Releasing again afterwards only refreshes the cached copy.
+        """
+        if self._file_bytes is None:
+            self._file_bytes = file_bytes
+    
+    def memory_usage(self) -> dict:
+        """Approximate bytes held per part: the raw file and whatever has been loaded."""
+        data = self._file_bytes
+        usage = {"file": len(data) if data is not None else 0}
+        for key, value in list(self._memo.items()):
+            if key not in self._sizes:
+                if isinstance(value, pd.DataFrame):
+                    self._sizes[key] = int(value.memory_usage(deep=True).sum())
+                elif isinstance(value, list):
+                    self._sizes[key] = estimate_object_size(value)
+                elif isinstance(value, ScanTotals):
+                    self._sizes[key] = value.memory_usage()
+                elif isinstance(value, tuple):
+                    ids, rejected = value
+                    self._sizes[key] = estimate_object_size(ids) + int(rejected.memory_usage(deep=True).sum())
+                else:
+                    self._sizes[key] = sys.getsizeof(value)
+            usage[key] = self._sizes[key]
+        return usage
+    
+    def _memoize(self, key: str, loader):
+        """Return the memoized value for ``key``, loading it once under a per-key lock."""
+        if key in self._memo:
+            return self._memo[key]
+        with self._locks.setdefault(key, threading.Lock()):
+            if key not in self._memo:
+                self._memo[key] = loader()
+        return self._memo[key]
+    
+    def _load_cached(self, part: str, parse: Callable[[], pd.DataFrame], columns: Optional[list] = None) -> pd.DataFrame:
+        """Read ``part`` from the disk cache, or parse it and store the result."""
+        if self.sheet_cache is None:
+            return parse()
+        df = self.sheet_cache.load(self.content_hash, part, columns)
+        if df is None:
+            df = parse()
+            self.sheet_cache.store(self.content_hash, part, df)
+        return df
+    
+    def prime(self, values: dict):
+        """Store values loaded elsewhere (e.g. in a worker process) unless already loaded."""
+        for key, value in values.items():
+            self._memo.setdefault(key, value)
+    
+    def is_loaded(self, key: str) -> bool:
+        """Check whether ``key`` (e.g. "df_data") has already been materialized."""
+        return key in self._memo
+    
+    @property
+    def columns(self) -> list:
+        """Header of the data sheet (reads a single row)."""
+        if self.data_sheet is None:
+            return []
+        return self._memoize(
+            "columns",
+            lambda: pd.read_excel(
+                self._open(), sheet_name=self.data_sheet, nrows=0, engine=get_excel_engine()
+            ).columns.tolist(),
+        )
+    
+    @property
+    def info(self) -> dict:
+        """Metadata from the Info sheet, or an empty dict when there is none."""
+        def load():
+            if "Info" not in self.sheet_names:
+                return {}
+            return extract_info_from_excel(self._load_cached("Info", lambda: read_info_sheet(self._open())))
+        return self._memoize("info", load)
+    
+    @property
+    def unique_names(self) -> Optional[list]:
+        """Deduplicated UniqueNames in first-seen order, or None without that column."""
+        return self.load_unique_names()
+    
+    def load_unique_names(self, progress: Optional[ParseProgress] = None) -> Optional[list]:
+        """Load ``unique_names``, reporting rows read to ``progress`` and stopping when it is cancelled.
+        
+        The same pass folds the ``_scan_columns`` into ScanTotals for the
+        realm split and the summary. The openpyxl stream reports every few
+        thousand rows; calamine, used only when set explicitly, parses the
+        columns in one call, so its progress only moves once it is done.
+        """
+        def load():
+            if "UniqueName" not in self.columns:
+                return None
+            if self.is_loaded("df_data"):
+                return self.df_data["UniqueName"].dropna().unique().tolist()
+            if self.sheet_cache is not None:
+                # A cached data sheet maps just the one column
+                df_ids = self.sheet_cache.load(self.content_hash, self._data_part, ["UniqueName"])
+                if df_ids is not None:
+                    return df_ids["UniqueName"].dropna().unique().tolist()
+            df_ids = self._load_cached(f"{self._data_part}:UniqueName", parse)
+            return df_ids["UniqueName"].tolist()
+        
+        def parse():
+            unique_names, totals = self._scan_data(progress)
+            if totals is not None:
+                self.prime({"scan_totals": self._store_totals(totals)})
+            return pd.DataFrame({"UniqueName": unique_names})
+        
+        if progress is not None:
+            progress.check()
+        return self._memoize("unique_names", load)
+    
+    @property
+    def _scan_columns(self) -> list:
+        """Columns the ID pass folds into ScanTotals, so the realm split and the summary need no read of their own."""
+        columns = [column for column in summary_source_columns(self.monitoring_type) if column in self.columns]
+        if REALM_COLUMN in self.columns:
+            columns = ["UniqueName", REALM_COLUMN] + columns
+        return columns
+    
+    @property
+    def _totals_part(self) -> str:
+        """Sheet cache part holding the ScanTotals."""
+        return f"{self._data_part}:totals"
+    
+    def _store_totals(self, totals: "ScanTotals") -> "ScanTotals":
+        if self.sheet_cache is not None:
+            self.sheet_cache.store(self.content_hash, self._totals_part, totals.to_frame())
+        return totals
+    
+    def _scan_data(self, progress: Optional[ParseProgress]) -> Tuple[Optional[list], Optional["ScanTotals"]]:
+        """Read the deduplicated IDs and the totals of the ``_scan_columns`` (None without any) in one pass."""
+        row_columns = self._scan_columns
+        totals = ScanTotals(self.monitoring_type) if row_columns else None
+        # The stream keeps memory bounded by the distinct values. calamine is
+        # faster but holds whole columns, so it has to be chosen explicitly.
+        if self.is_xlsx and EXCEL_ENGINE != "calamine":
+            unique_names = extract_unique_names_streaming(
+                self._open(), self.data_sheet, progress=progress, row_columns=row_columns,
+                on_rows=totals.add if totals is not None else None,
+            )
+            return unique_names, totals
+        df = pd.read_excel(
+            self._open(), sheet_name=self.data_sheet,
+            usecols=[column for column in dict.fromkeys(["UniqueName", *row_columns]) if column in self.columns],
+            engine=get_excel_engine(),
+        )
+        if progress is not None:
+            progress.total_rows = len(df)
+            progress.advance(len(df))
+        if totals is not None:
+            totals.add(df[row_columns])
+        return (df["UniqueName"].dropna().unique() if "UniqueName" in df.columns else None), totals
+    
+    def _scan_totals(self) -> "ScanTotals":
+        """The ScanTotals of the ``_scan_columns``, as the ID pass left them.
+        
+        When the IDs came from elsewhere, the totals are built from the loaded
+        frame or the sheet cache, or else by a pass of their own.
+        """
+        def load():
+            df = self.df_data[self._scan_columns] if self.is_loaded("df_data") else None
+            if df is None and self.sheet_cache is not None:
+                df = self.sheet_cache.load(self.content_hash, self._data_part, self._scan_columns)
+                df_totals = self.sheet_cache.load(self.content_hash, self._totals_part) if df is None else None
+                if df_totals is not None:
+                    return ScanTotals.from_frame(df_totals, self.monitoring_type)
+            if df is None:
+                return self._store_totals(self._scan_data(None)[1])
+            totals = ScanTotals(self.monitoring_type)
+            totals.add(df)
+            return totals
+        if not self.is_loaded("df_data"):
+            self.load_unique_names()
+        return self._memoize("scan_totals", load)
+    
+    def load_in_background(self, executor: Executor, progress: Optional[ParseProgress] = None) -> dict:
+        """Start reading the Info sheet and the IDs side by side on ``executor``.
+        
+        Returns futures keyed "info" and "query_ids". Each memoizes its part
+        on the handle, so the properties are free once a future is done. Only
+        the ID read reports to ``progress``; it also reads the columns of the
+        realm split and the summary.
+        """
+        def load_ids():
+            self.load_unique_names(progress)
+            return self.query_ids
+        return {
+            "info": executor.submit(lambda: self.info),
+            "query_ids": executor.submit(load_ids),
+        }
+    
+    @property
+    def query_ids(self) -> Optional[list]:
+        """UniqueNames normalized and validated for the IN-list, or None without that column."""
+        normalized = self._normalized_ids()
+        return normalized[0] if normalized is not None else None
+    
+    @property
+    def rejected_ids(self) -> Optional[pd.DataFrame]:
+        """UniqueNames that failed validation, with the reason."""
+        normalized = self._normalized_ids()
+        return normalized[1] if normalized is not None else None
+    
+    def _normalized_ids(self) -> Optional[Tuple[list, pd.DataFrame]]:
+        def load():
+            if self.unique_names is None:
+                return None
+            return normalize_unique_names(self.unique_names, self.monitoring_type)
+        return self._memoize("normalized_ids", load)
+    
+    @property
+    def df_data(self) -> Optional[pd.DataFrame]:
+        """The full data sheet as a DataFrame."""
+        if self.data_sheet is None:
+            return None
+        return self._memoize(
+            "df_data",
+            lambda: self._load_cached(
+                self.data_sheet,
+                lambda: optimize_frame_memory(
+                    pd.read_excel(self._open(), sheet_name=self.data_sheet, engine=get_excel_engine())
+                ),
+            ),
+        )
+    
+    @property
+    def realm_ids(self) -> Optional[dict]:
+        """Query IDs per realm of a multi-realm report, or None when it covers a single realm.
+        
+        A ``Realm`` column assigns every row to a realm; rows without one go
+        to the Info sheet's realm. Without that column the rows cannot be
+        attributed, so the report gets no split even when the Info sheet
+        lists several realms. The column is read along with the IDs.
+        """
+        def load():
+            if self.query_ids is None or REALM_COLUMN not in self.columns:
+                return None
+            realm_ids = self._scan_totals().realm_ids(self.info.get("realm", ""))
+            return realm_ids if len(realm_ids) > 1 else None
+        return self._memoize("realm_ids", load)
+    
+    @property
+    def summary(self) -> dict:
+        """Breakdowns of the data sheet for the Summary (see ``summarize_report``).
+        
+        The counts come from the ID pass (see ScanTotals), so this does not
+        load ``df_data`` or read the sheet again.
+        """
+        def load():
+            if not any(column in self.columns for column in summary_source_columns(self.monitoring_type)):
+                return {}
+            return self._scan_totals().summary()
+        return self._memoize("summary", load)
+    
+    @property
+    def _data_part(self) -> str:
+        """Sheet cache part holding the full data sheet."""
+        return self.data_sheet
+    
+    @property
+    def column_stats(self) -> Optional[pd.DataFrame]:
+        """Per-column statistics of the data sheet (loads ``df_data``)."""
+        if self.data_sheet is None:
+            return None
+        return self._memoize("column_stats", lambda: summarize_columns(self.df_data))
+
+
+# Suffixes of delimited exports, read with CsvReport instead of LazyWorkbook
+DELIMITED_SUFFIXES = (".csv", ".tsv", ".txt", ".csv.gz", ".tsv.gz", ".txt.gz")
+
+# Columns found in only one monitoring type's export, used to sniff the type
+TYPE_SIGNATURE_COLUMNS = {
+    "PO_Ordering": {"OrderID", "Recipients.OrderingMethod"},
+    "RC_Processing": {"ApprovedDate"},
+}
+
+
+def is_delimited_file(file_name: str) -> bool:
+    """Check whether a file name looks like a CSV/TSV export (optionally gzipped)."""
+    return file_name.lower().endswith(DELIMITED_SUFFIXES)
+
+
+def detect_type_from_name(file_name: str) -> Optional[str]:
+    """Find a monitoring type in a file name, e.g. ``acme_PO-Ordering_2025-06.csv``."""
+    normalized = re.sub(r"[\s\-]+", "_", file_name).lower()
+    for monitoring_type in TYPE_SIGNATURE_COLUMNS:
+        if monitoring_type.lower() in normalized:
+            return monitoring_type
+    return None
+
+
+def detect_type_from_header(columns: list) -> Optional[str]:
+    """Guess the monitoring type from the columns of an export."""
+    for monitoring_type, signature in TYPE_SIGNATURE_COLUMNS.items():
+        if signature & set(columns):
+            return monitoring_type
+    return None
+
+
+def sniff_delimiter(header_line: str, file_name: str = "") -> str:
+    """Tab for .tsv files, otherwise whatever separator the header line uses."""
+    if ".tsv" in file_name.lower():
+        return "\t"
+    try:
+        return csv.Sniffer().sniff(header_line, delimiters=",\t;|").delimiter
+    except csv.Error:
+        return ","
+
+
+def extract_unique_names_csv(source, column: str = "UniqueName", chunk_rows: int = CSV_CHUNK_ROWS,
+                             progress: Optional[ParseProgress] = None, row_columns: Iterable = (),
+                             on_rows: Optional[Callable[[pd.DataFrame], None]] = None,
+                             **read_options) -> Optional[list]:
+    """Read one column of a delimited file in chunks and dedupe it in first-seen order.
+    
+    Only ``column`` is parsed and each chunk is folded into the set of IDs
+    seen so far, so memory grows with the number of distinct IDs rather than
+    with the file size. IDs are kept as text, preserving leading zeros.
+    ``progress``, if given, is advanced after every chunk. The
+    ``row_columns`` are read as text too and each chunk of those present is
+    handed to ``on_rows``, as in ``extract_unique_names_streaming``. Returns
+    None when the file has no ``column``.
+    """
+    wanted = {column, *row_columns} if on_rows else {column}
+    seen = {}
+    has_column = None
+    with pd.read_csv(source, usecols=lambda name: name in wanted, dtype=str, chunksize=chunk_rows,
+                     **read_options) as reader:
+        for chunk in reader:
+            has_column = column in chunk.columns
+            if has_column:
+                seen.update(dict.fromkeys(chunk[column].dropna().unique()))
+            if on_rows:
+                on_rows(chunk[[name for name in row_columns if name in chunk.columns]])
+            if progress is not None:
+                progress.advance(len(chunk))
+    return None if has_column is False else list(seen)
+
+
+class CsvReport(LazyWorkbook):
+    """Lazy handle on a CSV/TSV export, plain or gzipped, with the workbook interface.
+    
+    Exports have no Info sheet, so ``info`` is empty. The monitoring type is
+    taken from the file name, else sniffed from the header; the data "sheet"
+    is named after it. UniqueName is always read as text.
+    """
+    
+    def __init__(self, file_bytes: bytes, file_name: str, content_hash: Optional[str] = None,
+                 sheet_cache: Optional[SheetCache] = None):
+        super().__init__(file_bytes, content_hash, sheet_cache, file_name)
+    
+    def _read_layout(self):
+        self.is_xlsx = False
+        compression = "gzip" if self._file_bytes[:2] == b"\x1f\x8b" else None
+        self._read_options = {
+            "sep": sniff_delimiter(self._read_header_line(compression), self.file_name),
+            "compression": compression,
+            "encoding": "utf-8-sig",
+            "encoding_errors": "replace",
+        }
+        self.sheet_names = []
+        self.monitoring_type = detect_type_from_name(self.file_name) or detect_type_from_header(self.columns)
+        self.data_sheet = self.monitoring_type
+    
+    def _read_header_line(self, compression: Optional[str]) -> str:
+        raw = gzip.GzipFile(fileobj=self._open()) if compression == "gzip" else self._open()
+        return raw.readline().decode("utf-8-sig", errors="replace")
+    
+    @property
+    def columns(self) -> list:
+        return self._memoize(
+            "columns",
+            lambda: pd.read_csv(self._open(), nrows=0, **self._read_options).columns.tolist(),
+        )
+    
+    def _scan_data(self, progress: Optional[ParseProgress]) -> Tuple[Optional[list], Optional["ScanTotals"]]:
+        totals = ScanTotals(self.monitoring_type) if self._scan_columns else None
+        unique_names = extract_unique_names_csv(
+            self._open(), progress=progress, row_columns=self._scan_columns,
+            on_rows=totals.add if totals is not None else None, **self._read_options
+        )
+        return unique_names, totals
+    
+    @property
+    def _data_part(self) -> str:
+        return "csv"
+    
+    @property
+    def df_data(self) -> Optional[pd.DataFrame]:
+        if self.data_sheet is None:
+            return None
+        return self._memoize(
+            "df_data",
+            lambda: self._load_cached(
+                self._data_part,
+                lambda: optimize_frame_memory(
+                    pd.read_csv(self._open(), dtype={"UniqueName": str}, **self._read_options)
+                ),
+            ),
+        )
+
+
+def open_report(file_bytes: bytes, file_name: Optional[str] = None, content_hash: Optional[str] = None) -> LazyWorkbook:
+    """Open an uploaded report as a CsvReport or LazyWorkbook depending on its name."""
+    if file_name is not None and is_delimited_file(file_name):
+        return CsvReport(file_bytes, file_name, content_hash)
+    return LazyWorkbook(file_bytes, content_hash, file_name=file_name)
+
+
+# Valid canonical (stripped, upper-cased) IDs per monitoring type. Tighten a
+# pattern here to reject more; other types only need a non-blank ID.
+ID_PATTERNS = {
+    "PO_Ordering": re.compile(r"[A-Z]*\d+(?:-V\d+)?"),
+    "RC_Processing": re.compile(r"[A-Z]*\d+"),
+}
+DEFAULT_ID_PATTERN = re.compile(r"[^\x00-\x1f]+")
+
+# Quote characters stripped from both ends of an ID
+STRAY_QUOTES = "'\"`\u2018\u2019\u201c\u201d"
+
+
+def normalize_unique_names(unique_names: Iterable, monitoring_type: Optional[str] = None) -> Tuple[list, pd.DataFrame]:
+    """Canonicalize, validate, escape and dedupe IDs in one vectorized pass.
+    
+    Every ID is turned into text, stripped of whitespace and surrounding
+    quotes, loses a float-style ``.0`` suffix (``PO123.0``), is upper-cased and
+    matched against the type's pattern from ``ID_PATTERNS``. Valid IDs have
+    any remaining ``'`` doubled for the AQL string literal and are deduped
+    in first-seen order. Returns the valid IDs and a frame of the rejected
+    ones with the original value, its canonical form and the reason.
+    """
+    original = pd.Series(list(unique_names), dtype=object)
+    # Missing values become blank first; astype(str) would turn them into "None" or "nan"
+    text = original.where(original.notna(), "").astype(str)
+    canonical = (
+        text
+        .str.strip()
+        .str.strip(STRAY_QUOTES)
+        .str.strip()
+        .str.replace(r"(?<=\d)\.0+$", "", regex=True)
+        .str.upper()
+    )
+    pattern = ID_PATTERNS.get(monitoring_type, DEFAULT_ID_PATTERN)
+    valid = canonical.str.fullmatch(pattern)
+    
+    reasons = pd.Series("invalid format", index=canonical.index)
+    reasons[canonical == ""] = "empty"
+    rejected = pd.DataFrame({
+        "UniqueName": text[~valid],
+        "Normalized": canonical[~valid],
+        "Reason": reasons[~valid],
+    }).reset_index(drop=True)
+    
+    escaped = canonical[valid].str.replace("'", "''", regex=False)
+    return escaped.drop_duplicates().tolist(), rejected
+
+
+# Data sheet column naming the realm of each row in multi-realm reports
+REALM_COLUMN = "Realm"
+
+
+def parse_realm_list(value) -> list:
+    """Realm names from the Info sheet's "Realms" value, in order and without repeats."""
+    if not value:
+        return []
+    return list(dict.fromkeys(part.strip() for part in re.split(r"[,;\n]", str(value)) if part.strip()))
+
+
+def realm_file_part(realm: str) -> str:
+    """A realm name made safe for use in a file name."""
+    return re.sub(r"[^\w.-]+", "_", realm) or "no_realm"
+
+
+def split_ids_by_realm(unique_names: pd.Series, realms: pd.Series, monitoring_type: Optional[str] = None,
+                       default_realm: str = "") -> dict:
+    """Normalized query IDs per realm, with realms in first-seen order.
+    
+    Rows without a realm count towards ``default_realm``. Each realm's IDs
+    are normalized and deduped on their own; realms left without a valid ID
+    are dropped.
+    """
+    totals = ScanTotals(monitoring_type)
+    totals.add(pd.DataFrame({"UniqueName": unique_names.to_numpy(), REALM_COLUMN: realms.to_numpy()}))
+    return totals.realm_ids(default_realm)
+
+
+def summarize_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Type, non-null and distinct counts for every column of a frame."""
+    return pd.DataFrame({
+        "Column": df.columns.astype(str),
+        "Type": df.dtypes.astype(str).to_numpy(),
+        "Non-null": df.notna().sum().to_numpy(),
+        "Unique": [df[column].nunique(dropna=True) for column in df.columns],
+    })
+
+
+# Summary breakdowns per monitoring type as (data sheet column, title); other
+# types only get the status breakdown
+SUMMARY_COLUMNS = {
+    "PO_Ordering": [
+        ("StatusString", "Status"),
+        ("Recipients.OrderingMethod", "Ordering Method"),
+        ("Recipients.FailureReason", "Failure Reason"),
+        ("Supplier.Name", "Supplier"),
+    ],
+    "RC_Processing": [
+        ("StatusString", "Status"),
+        ("Supplier.Name", "Supplier"),
+    ],
+}
+DEFAULT_SUMMARY_COLUMNS = [("StatusString", "Status")]
+
+# Types whose rows are bucketed by age, from the first of these dates a row has
+AGE_COLUMNS = {"RC_Processing": ["ApprovedDate", "CreateDate"]}
+AGE_TITLE = "Age"
+# Lower bounds in days and labels of the age buckets
+AGE_BUCKETS = [(0, "< 1 day"), (1, "1-3 days"), (3, "3-7 days"), (7, "1-4 weeks"), (28, "> 4 weeks")]
+BLANK_LABEL = "(blank)"
+
+
+def summary_source_columns(monitoring_type: Optional[str]) -> list:
+    """Data sheet columns ``summarize_report`` looks at for a monitoring type."""
+    columns = [column for column, _ in SUMMARY_COLUMNS.get(monitoring_type, DEFAULT_SUMMARY_COLUMNS)]
+    return columns + AGE_COLUMNS.get(monitoring_type, [])
+
+
+def bucket_ages(dates: pd.Series, now: Optional[pd.Timestamp] = None) -> pd.Series:
+    """Categorical age bucket of every date; rows without a date are blank."""
+    dates = pd.to_datetime(dates, errors="coerce")
+    if dates.dt.tz is not None:
+        dates = dates.dt.tz_convert(None)
+    now = pd.Timestamp.now() if now is None else now
+    ages = (now - dates) / pd.Timedelta(days=1)
+    # Future dates count as new
+    bins = [-np.inf] + [lower for lower, _ in AGE_BUCKETS[1:]] + [np.inf]
+    return pd.cut(ages, bins=bins, labels=[label for _, label in AGE_BUCKETS], right=False)
+
+
+def first_dates(df: pd.DataFrame, monitoring_type: Optional[str] = None) -> Optional[pd.Series]:
+    """The first of the type's ``AGE_COLUMNS`` dates each row has, or None without any of those columns."""
+    date_columns = [column for column in AGE_COLUMNS.get(monitoring_type, []) if column in df.columns]
+    if not date_columns:
+        return None
+    dates = pd.to_datetime(df[date_columns[0]], errors="coerce")
+    for column in date_columns[1:]:
+        dates = dates.fillna(pd.to_datetime(df[column], errors="coerce"))
+    return dates
+
+
+def summarize_report(df: pd.DataFrame, monitoring_type: Optional[str] = None,
+                     now: Optional[pd.Timestamp] = None) -> dict:
+    """Row counts per value of the type's breakdown columns, and per age bucket.
+    
+    All breakdowns come out of a single groupby over the combination of
+    their columns; each breakdown then sums that small result along its own
+    level. Blank values are counted as "(blank)" and columns missing from
+    ``df`` are skipped. Returns ``{title: counts}`` with the counts as a
+    Series, largest first (age buckets stay in age order).
+    """
+    keys = {}
+    for column, title in SUMMARY_COLUMNS.get(monitoring_type, DEFAULT_SUMMARY_COLUMNS):
+        if column in df.columns:
+            keys[title] = df[column]
+    dates = first_dates(df, monitoring_type)
+    if dates is not None:
+        keys[AGE_TITLE] = bucket_ages(dates, now)
+    if not keys or df.empty:
+        return {}
+    
+    # Group on integer codes; -1 (blank) picks the label appended last
+    codes = {}
+    labels = {}
+    for title, values in keys.items():
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            key_codes, uniques = values.cat.codes.to_numpy(), values.cat.categories
+        else:
+            key_codes, uniques = pd.factorize(values)
+        codes[title] = key_codes
+        labels[title] = np.append(np.asarray(uniques, dtype=object).astype(str), BLANK_LABEL)
+    
+    combinations = pd.DataFrame(codes).groupby(list(codes), sort=False).size()
+    summary = {}
+    for level, title in enumerate(codes):
+        counts = combinations.groupby(level=level).sum()
+        if title == AGE_TITLE:
+            counts = counts.loc[sorted(counts.index, key=lambda code: (code < 0, code))]
+        else:
+            counts = counts.sort_values(ascending=False, kind="stable")
+        summary[title] = pd.Series(counts.to_numpy(), index=labels[title][counts.index.to_numpy()])
+    return summary
+
+
+class ScanTotals:
+    """Running totals of the data sheet rows behind the realm split and the Summary.
+    
+    Rows are folded in chunk by chunk (``add``) and only their totals are
+    kept: the distinct UniqueNames per realm, the row count per breakdown
+    value and the row count per minute of the age date. Memory therefore
+    grows with distinct values rather than with rows. Ages are bucketed when
+    ``summary`` is called, to the minute, so stored totals do not go stale.
+    """
+    
+    def __init__(self, monitoring_type: Optional[str] = None):
+        self.monitoring_type = monitoring_type
+        self.realm_names = {}
+        self.counts = {}
+        self.dates = {}
+    
+    def add(self, df: pd.DataFrame):
+        """Fold a chunk of rows into the totals."""
+        if df.empty:
+            return
+        if "UniqueName" in df.columns and REALM_COLUMN in df.columns:
+            realms = df[REALM_COLUMN].astype(object)
+            pairs = pd.DataFrame({
+                "Realm": realms.where(realms.notna(), "").astype(str).str.strip().to_numpy(),
+                "UniqueName": df["UniqueName"].to_numpy(),
+            }).dropna(subset=["UniqueName"])
+            for realm, names in pairs.groupby("Realm", sort=False)["UniqueName"]:
+                self.realm_names.setdefault(realm, {}).update(dict.fromkeys(names))
+        
+        age_columns = AGE_COLUMNS.get(self.monitoring_type, [])
+        breakdowns = summarize_report(df.drop(columns=age_columns, errors="ignore"), self.monitoring_type)
+        for title, counts in breakdowns.items():
+            totals = self.counts.setdefault(title, {})
+            for label, count in counts.items():
+                totals[label] = totals.get(label, 0) + int(count)
+        dates = first_dates(df, self.monitoring_type)
+        if dates is not None:
+            for minute, count in dates.dt.floor("min").value_counts(dropna=False, sort=False).items():
+                minute = None if pd.isna(minute) else minute
+                self.dates[minute] = self.dates.get(minute, 0) + int(count)
+    
+    def realm_ids(self, default_realm: str = "") -> dict:
+        """Normalized query IDs per realm, as ``split_ids_by_realm`` returns them."""
+        names_by_realm = {}
+        for realm, names in self.realm_names.items():
+            names_by_realm.setdefault(realm or default_realm, []).extend(names)
+        realm_ids = {}
+        for realm, names in names_by_realm.items():
+            ids, _ = normalize_unique_names(names, self.monitoring_type)
+            if ids:
+                realm_ids[realm] = ids
+        return realm_ids
+    
+    def summary(self, now: Optional[pd.Timestamp] = None) -> dict:
+        """Breakdowns in the form ``summarize_report`` returns, with ages as of ``now``."""
+        summary = {
+            title: pd.Series(counts, dtype="int64").sort_values(ascending=False, kind="stable")
+            for title, counts in self.counts.items()
+        }
+        if self.dates:
+            buckets = bucket_ages(pd.Series(list(self.dates), dtype=object), now)
+            counts = np.bincount(buckets.cat.codes.to_numpy() + 1, weights=list(self.dates.values()),
+                                 minlength=len(AGE_BUCKETS) + 1).astype("int64")
+            # Buckets in age order, blank last
+            order = list(range(1, len(AGE_BUCKETS) + 1)) + [0]
+            labels = [BLANK_LABEL] + [label for _, label in AGE_BUCKETS]
+            summary[AGE_TITLE] = pd.Series(
+                [counts[code] for code in order if counts[code]],
+                index=[labels[code] for code in order if counts[code]],
+                dtype="int64",
+            )
+        return summary
+    
+    def memory_usage(self) -> int:
+        """Approximate bytes held by the totals."""
+        parts = [list(names) for names in self.realm_names.values()] + [list(counts) for counts in self.counts.values()]
+        return sum(estimate_object_size(part) for part in parts) + estimate_object_size(list(self.dates))
+    
+    def to_frame(self) -> pd.DataFrame:
+        """The totals as a frame of text and counts, for the sheet cache."""
+        rows = [("realm", realm, str(name), 0) for realm, names in self.realm_names.items() for name in names]
+        rows += [("count", title, label, count) for title, counts in self.counts.items() for label, count in counts.items()]
+        rows += [("date", "", None if minute is None else minute.isoformat(), count) for minute, count in self.dates.items()]
+        return pd.DataFrame(rows, columns=["Kind", "Key", "Value", "Count"])
+    
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, monitoring_type: Optional[str] = None) -> "ScanTotals":
+        """Totals stored with ``to_frame``."""
+        totals = cls(monitoring_type)
+        for kind, key, value, count in df.itertuples(index=False):
+            if kind == "realm":
+                totals.realm_names.setdefault(key, {})[value] = None
+            elif kind == "count":
+                totals.counts.setdefault(key, {})[value] = int(count)
+            else:
+                totals.dates[None if pd.isna(value) else pd.Timestamp(value)] = int(count)
+        return totals
+
+
+def select_rows(
+    df: pd.DataFrame,
+    filter_column: Optional[str] = None,
+    filter_text: str = "",
+    sort_column: Optional[str] = None,
+    descending: bool = False,
+) -> np.ndarray:
+    """Return the row positions of ``df`` after filtering and sorting.
+    
+    The filter is a case-insensitive substring match on one column. Sorting
+    is stable with missing values last; columns mixing types that cannot be
+    compared are sorted by their text representation. Only positions are
+    returned, so callers can slice out one page without copying the frame.
+    """
+    positions = np.arange(len(df))
+    
+    if filter_column is not None and filter_text:
+        column = df[filter_column]
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            # Match each category once instead of every row
+            categories = column.cat.categories
+            hits = categories[categories.astype(str).str.contains(filter_text, case=False, regex=False)]
+            matches = column.isin(hits)
+        else:
+            matches = column.notna() & column.astype(str).str.contains(filter_text, case=False, regex=False)
+        positions = positions[matches.to_numpy()]
+    
+    if sort_column is not None:
+        column = df[sort_column].iloc[positions].reset_index(drop=True)
+        try:
+            order = column.sort_values(ascending=not descending, kind="stable", na_position="last").index
+        except TypeError:
+            order = column.astype(str).where(column.notna()).sort_values(
+                ascending=not descending, kind="stable", na_position="last"
+            ).index
+        positions = positions[order.to_numpy()]
+    
+    return positions
+
+
+def scan_workbook(file_bytes: bytes, file_name: Optional[str] = None) -> dict:
+    """Load the header, Info dict and UniqueNames of a report; runs in worker processes."""
+    workbook = open_report(file_bytes, file_name)
+    return {"columns": workbook.columns, "info": workbook.info, "unique_names": workbook.unique_names}
+
+
+def load_workbooks_parallel(workbooks: list, executor: Executor):
+    """Load Info and UniqueNames of several workbooks concurrently on ``executor``.
+    
+    Results are primed into each handle, so workbooks that are already loaded
+    are skipped and later accesses are free.
+    """
+    pending = [
+        workbook for workbook in workbooks
+        if not (workbook.is_loaded("info") and workbook.is_loaded("unique_names"))
+    ]
+    if len(pending) < 2:
+        return
+    futures = [executor.submit(scan_workbook, workbook._open().getvalue(), workbook.file_name) for workbook in pending]
+    for workbook, future in zip(pending, futures):
+        workbook.prime(future.result())
+
+
+def has_query_support(monitoring_type: str) -> bool:
+    """Check if the monitoring type has AQL query support."""
+    return monitoring_type in ["PO_Ordering", "RC_Processing"]
+
+
+# AQL templates; {names} is replaced by the quoted, comma-separated IN-list.
+PO_ORDERING_QUERY = """SELECT
+UniqueName "PO ID Ariba",
+OrderID "Order ID SAP",
+Name "PO Title",
+StatusString "Status",
+"Active" "Active",
+TimeCreated,
+TimeUpdated,
+Recipients.OrderingMethod "Ordering Method",
+Recipients.State "Recipient State",
+Recipients.FailureReason "Failure Reason",
+Recipients.TimeCreated "Recipient TimeCreated",
+Recipients.TimeUpdated "Recipient TimeUpdated",
+Supplier.Name as "Supplier Name",
+Supplier.UniqueName as "Supplier ID",
+SupplierLocation.PreferredOrderingMethod as SupplierOrderingMethod,
+SupplierLocation.EmailAddress as EmailAddress,
+SupplierLocation.AribaNetworkId as AribaNetworkId,
+this
+FROM ariba.purchasing.core.PurchaseOrder
+WHERE UniqueName IN ({names})
+ORDER BY StatusString, UniqueName, TimeCreated, Recipients.OrderingMethod"""
+
+RC_PROCESSING_QUERY = """SELECT DISTINCT UniqueName as "Id",
+UniqueName,
+StatusString,
+CreateDate,
+ApprovedDate,
+'Awaiting processing' ProcessedStateString
+FROM ariba.receiving.core.Receipt
+WHERE StatusString = 'Approved'
+AND ProcessedState = 1
+AND UniqueName IN ({names})
+ORDER BY ApprovedDate DESC"""
+
+QUERY_TEMPLATES = {
+    "PO_Ordering": PO_ORDERING_QUERY,
+    "RC_Processing": RC_PROCESSING_QUERY,
+}
+
+# IDs joined per chunk when streaming a query
+QUERY_CHUNK_IDS = 1000
+
+
+def iter_query_text(template: str, unique_names: Iterable) -> Iterator[str]:
+    """Yield the query text in pieces, never holding the whole IN-list at once."""
+    head, _, tail = template.partition("{names}")
+    yield head
+    names = iter(unique_names)
+    separator = ""
+    while True:
+        chunk = list(itertools.islice(names, QUERY_CHUNK_IDS))
+        if not chunk:
+            break
+        yield separator + ", ".join([f"'{name}'" for name in chunk])
+        separator = ", "
+    yield tail
+
+
+def render_query(template: str, unique_names: Iterable) -> str:
+    """Build the complete query text."""
+    return "".join(iter_query_text(template, unique_names))
+
+
+def write_query(fileobj, template: str, unique_names: Iterable) -> int:
+    """Stream the query into a text file object and return the characters written."""
+    written = 0
+    for piece in iter_query_text(template, unique_names):
+        written += fileobj.write(piece)
+    return written
+
+
+def estimate_query_size(template: str, unique_names: list) -> int:
+    """UTF-8 size of the rendered query in bytes, computed without rendering it."""
+    # Each ID is quoted and all but the first are preceded by ", "
+    names_bytes = sum(len(str(name).encode("utf-8")) + 2 for name in unique_names)
+    names_bytes += 2 * max(len(unique_names) - 1, 0)
+    return len(template.replace("{names}", "").encode("utf-8")) + names_bytes
+
+
+def preview_query(template: str, unique_names: Iterable, max_chars: int) -> Tuple[str, bool]:
+    """Return the first ``max_chars`` characters of the query and whether it was cut."""
+    parts = []
+    length = 0
+    for piece in iter_query_text(template, unique_names):
+        parts.append(piece)
+        length += len(piece)
+        if length > max_chars:
+            return "".join(parts)[:max_chars], True
+    return "".join(parts), False
+
+
+def generate_po_ordering_query(unique_names: list) -> str:
+    """Generate AQL query for PO Ordering."""
+    return render_query(PO_ORDERING_QUERY, unique_names)
+
+
+def generate_rc_processing_query(unique_names: list) -> str:
+    """Generate AQL query for RC Processing."""
+    return render_query(RC_PROCESSING_QUERY, unique_names)
+
+
+QUERY_BUILDERS = {
+    "PO_Ordering": generate_po_ordering_query,
+    "RC_Processing": generate_rc_processing_query,
+}
+
+
+def get_query_builder(monitoring_type: str) -> Callable[[list], str]:
+    """Return the AQL query generator for a supported monitoring type."""
+    return QUERY_BUILDERS[monitoring_type]
+
+
+def iter_id_batches(unique_names: Iterable, max_ids: int = 0, max_bytes: int = 0) -> Iterator[list]:
+    """Split IDs into consecutive batches for separate IN-lists.
+    
+    A batch is closed once it holds ``max_ids`` IDs or when the next ID would
+    push its rendered IN-list past ``max_bytes``. A limit of 0 disables it.
+    A single ID longer than ``max_bytes`` still gets a batch of its own.
+    """
+    batch = []
+    batch_bytes = 0
+    for name in unique_names:
+        # Rendered as 'name' plus the ", " separator
+        name_bytes = len(str(name).encode("utf-8")) + 4
+        if batch and (
+            (max_ids and len(batch) >= max_ids)
+            or (max_bytes and batch_bytes + name_bytes > max_bytes)
+        ):
+            yield batch
+            batch = []
+            batch_bytes = 0
+        batch.append(name)
+        batch_bytes += name_bytes
+    if batch:
+        yield batch
+
+
+def count_id_batches(unique_names: Iterable, max_ids: int = 0, max_bytes: int = 0) -> int:
+    """Count the batches ``iter_id_batches`` yields without building any query."""
+    return sum(1 for _ in iter_id_batches(unique_names, max_ids, max_bytes))
+
+
+def iter_batched_queries(
+    unique_names: Iterable,
+    query_builder: Callable[[list], str],
+    max_ids: int = 0,
+    max_bytes: int = 0,
+) -> Iterator[str]:
+    """Lazily generate one query per ID batch."""
+    for batch in iter_id_batches(unique_names, max_ids, max_bytes):
+        yield query_builder(batch)
+
+
+# Range compaction: runs of at least this many consecutive IDs become one
+# range predicate instead of IN-list literals.
+COMPACT_MIN_RUN = int(os.environ.get("POM_COMPACT_MIN_RUN", "8"))
+
+# The predicate of every template that compaction rewrites
+ID_PREDICATE = "UniqueName IN ({names})"
+
+# ASCII digits only; other Unicode digits do not sort like numbers
+_NUMBERED_ID = re.compile(r"(.*?)([0-9]+)")
+
+# LIKE wildcards; IDs whose prefix has one stay single
+LIKE_WILDCARDS = "%_"
+
+
+def id_sort_key(name) -> tuple:
+    """Order IDs by prefix, digit count and number, so that runs end up adjacent."""
+    match = _NUMBERED_ID.fullmatch(str(name))
+    if match is None:
+        return (str(name), -1, 0)
+    prefix, digits = match.groups()
+    return (prefix, len(digits), int(digits))
+
+
+def compact_id_ranges(unique_names: Iterable, min_run: int = COMPACT_MIN_RUN) -> Tuple[list, list]:
+    """Split IDs into single IDs and runs of consecutive numbers.
+    
+    IDs are grouped by prefix and by the width of their numeric suffix, so
+    ``PO0999`` and ``PO1000`` can share a run while ``PO999`` cannot. Runs
+    shorter than ``min_run`` stay single. Returns ``(singles, ranges)`` where
+    each range is ``(first_id, last_id, prefix, width)``.
+    """
+    singles = []
+    ranges = []
+    run = []
+    
+    def close_run():
+        if len(run) >= min_run:
+            prefix, width, _ = id_sort_key(run[0])
+            ranges.append((str(run[0]), str(run[-1]), prefix, width))
+        else:
+            singles.extend(run)
+        run.clear()
+    
+    previous_key = None
+    for name in sorted(set(unique_names), key=id_sort_key):
+        key = id_sort_key(name)
+        # LIKE wildcards in the prefix would make the length guard inexact
+        if key[1] < 0 or any(char in key[0] for char in LIKE_WILDCARDS):
+            close_run()
+            singles.append(name)
+            previous_key = None
+            continue
+        if previous_key is not None and key[:2] == previous_key[:2] and key[2] == previous_key[2] + 1:
+            run.append(name)
+        else:
+            close_run()
+            run.append(name)
+        previous_key = key
+    close_run()
+    return singles, ranges
+
+
+def compact_query(template: str, unique_names: Iterable, min_run: int = COMPACT_MIN_RUN) -> Tuple[str, list]:
+    """Rewrite a template so that runs of consecutive IDs are selected by range.
+    
+    The ``UniqueName IN ({names})`` predicate becomes an OR of the IN-list
+    for the remaining IDs and, per run, a predicate of the form
+    
+        (UniqueName >= 'PO10001' AND UniqueName <= 'PO14999' AND UniqueName LIKE 'PO_____')
+    
+    Only operators AQL supports are used. The bounds compare as text and the
+    LIKE guard pins the length, so the result selects exactly the rows of
+    the plain IN-list under one assumption: every UniqueName with that
+    prefix and length has only digits after the prefix, as Ariba's
+    prefix-plus-number IDs do. A look-alike such as ``PO12X45`` would be
+    selected too. Returns the rewritten template and the IDs left for its
+    ``{names}`` placeholder; the usual rendering functions take both
+    unchanged.
+    """
+    singles, ranges = compact_id_ranges(unique_names, min_run)
+    if not ranges:
+        return template, singles
+    if ID_PREDICATE not in template:
+        raise ValueError(f"Template has no '{ID_PREDICATE}' predicate to compact")
+    
+    predicates = [ID_PREDICATE] if singles else []
+    for first, last, prefix, width in ranges:
+        predicates.append(
+            f"(UniqueName >= '{first}' AND UniqueName <= '{last}' AND UniqueName LIKE '{prefix}{'_' * width}')"
+        )
+    return template.replace(ID_PREDICATE, "(" + "\nOR ".join(predicates) + ")"), singles
+
+
+def build_batched_queries(monitoring_type: str, unique_names: list, max_ids: int = 0, max_bytes: int = 0,
+                          compact: bool = False) -> list:
+    """All batch queries for a list of IDs, split as ``iter_id_batches`` splits them."""
+    if compact:
+        # Sorted batches keep runs of consecutive IDs together
+        template = QUERY_TEMPLATES[monitoring_type]
+        batches = iter_id_batches(sorted(unique_names, key=id_sort_key), max_ids, max_bytes)
+        return [render_query(*compact_query(template, batch)) for batch in batches]
+    return list(iter_batched_queries(unique_names, get_query_builder(monitoring_type), max_ids, max_bytes))
+
+
+def build_realm_queries(monitoring_type: str, realm_ids: dict, executor: Executor, max_ids: int = 0,
+                        max_bytes: int = 0, compact: bool = False) -> dict:
+    """Every realm's batch queries, generated concurrently on ``executor``, in realm order."""
+    futures = {
+        realm: executor.submit(build_batched_queries, monitoring_type, unique_names, max_ids, max_bytes, compact)
+        for realm, unique_names in realm_ids.items()
+    }
+    return {realm: future.result() for realm, future in futures.items()}
@@ -0,0 +1,195 @@
+"""Disk cache of parsed workbook parts in the Feather (Arrow IPC) format.
+
+Parsing xlsx XML is by far the slowest step of loading a report. The first
+parse of a sheet stores the resulting frame under the workbook's content
+hash; later loads, also after a server restart, memory-map that file
+instead. Files are written uncompressed so Arrow can map them without
+decoding. Raw uploads that a handle released from memory are kept here
+too. The cache is capped in size and evicts the least recently used
+files, judged by their modification time, which every hit refreshes.
+
+The cache needs ``pyarrow``; without it ``get_default_sheet_cache()``
+returns None and everything is parsed from the workbook as before.
+
+Usage:
+    python sheet_cache.py stats
+    python sheet_cache.py prune [--max-mb N]
+    python sheet_cache.py clear
+"""
+
+import argparse
+import functools
+import os
+import sys
+import tempfile
+import time
+import urllib.parse
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+    feather = None
+
+
+# Cache location and size cap; a cap of 0 disables the cache.
+SHEET_CACHE_DIR = Path(os.environ.get("POM_SHEET_CACHE_DIR", Path(tempfile.gettempdir()) / "pom_sheet_cache"))
+SHEET_CACHE_MAX_MB = int(os.environ.get("POM_SHEET_CACHE_MAX_MB", "512"))
+
+CACHE_SUFFIX = ".feather"
+# Raw uploads kept so that a handle can drop its in-memory copy
+UPLOAD_SUFFIX = ".bin"
+
+
+class SheetCache:
+    """Content-addressed store of DataFrames with a size cap and LRU eviction.
+
+    Entries are keyed by ``(content_hash, part)``, where ``part`` names a
+    sheet or a value derived from one. Frames that Arrow cannot represent
+    (e.g. columns mixing numbers and text) are simply not cached.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+
+    def path(self, content_hash: str, part: str, suffix: str = CACHE_SUFFIX) -> Path:
+        # Quoting keeps any sheet name a valid, unambiguous file name
+        return self.directory / f"{content_hash}.{urllib.parse.quote(part, safe='')}{suffix}"
+
+    def load(self, content_hash: str, part: str, columns: Optional[list] = None) -> Optional[pd.DataFrame]:
+        """Memory-map a cached frame, or return None on a miss."""
+        path = self.path(content_hash, part)
+        try:
+            table = feather.read_table(path, columns=columns, memory_map=True)
+            os.utime(path)
+        except (OSError, pa.ArrowException):
+            return None
+        return table.to_pandas()
+
+    def store(self, content_hash: str, part: str, df: pd.DataFrame) -> bool:
+        """Write a frame to the cache; return False when it cannot be cached."""
+        if not all(isinstance(column, str) for column in df.columns):
+            return False
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+        except (pa.ArrowException, TypeError, ValueError):
+            return False
+
+        return self._write(
+            self.path(content_hash, part),
+            lambda f: feather.write_feather(table, f, compression="uncompressed"),
+        )
+
+    def load_bytes(self, content_hash: str, part: str) -> Optional[bytes]:
+        """Read a cached raw file, or return None on a miss."""
+        path = self.path(content_hash, part, UPLOAD_SUFFIX)
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+        except OSError:
+            return None
+        return data
+
+    def store_bytes(self, content_hash: str, part: str, data: bytes) -> bool:
+        """Write a raw file (e.g. an upload) to the cache; return False when it cannot be stored."""
+        path = self.path(content_hash, part, UPLOAD_SUFFIX)
+        if path.exists():
+            os.utime(path)
+            return True
+        return self._write(path, lambda f: f.write(data))
+
+    def _write(self, path: Path, write) -> bool:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary file first so readers never see a partial file
+        fd, tmp_name = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp_name, path)
+        except OSError:
+            Path(tmp_name).unlink(missing_ok=True)
+            return False
+        self.prune()
+        return True
+
+    def entries(self) -> list:
+        """Cached files as ``(path, size, mtime)``, least recently used first."""
+        entries = []
+        for path in self.directory.glob("*"):
+            if not path.name.endswith((CACHE_SUFFIX, UPLOAD_SUFFIX)):
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime))
+        return sorted(entries, key=lambda entry: entry[2])
+
+    def prune(self, max_bytes: Optional[int] = None) -> int:
+        """Evict least recently used files until the cache fits; return the count removed."""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for path, size, _ in entries:
+            if total <= max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        return removed
+
+    def clear(self) -> int:
+        """Remove every cached file, including leftovers of interrupted writes."""
+        for path in self.directory.glob("*.tmp"):
+            path.unlink(missing_ok=True)
+        return self.prune(0)
+
+
+@functools.lru_cache(maxsize=None)
+def get_default_sheet_cache() -> Optional[SheetCache]:
+    """The cache configured by the environment, or None when disabled or unavailable."""
+    if feather is None or SHEET_CACHE_MAX_MB <= 0:
+        return None
+    return SheetCache(SHEET_CACHE_DIR, SHEET_CACHE_MAX_MB * 1024 * 1024)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Inspect or clean the disk cache of parsed workbooks.")
+    parser.add_argument("command", choices=["stats", "prune", "clear"])
+    parser.add_argument("--dir", type=Path, default=SHEET_CACHE_DIR, help="Cache directory")
+    parser.add_argument("--max-mb", type=int, default=SHEET_CACHE_MAX_MB, help="Size to prune down to")
+    args = parser.parse_args(argv)
+
+    if feather is None:
+        print("pyarrow is not installed; the sheet cache is disabled", file=sys.stderr)
+        return 1
+
+    cache = SheetCache(args.dir, args.max_mb * 1024 * 1024)
+    if not cache.directory.is_dir():
+        print(f"No cache at {cache.directory}")
+        return 0
+
+    if args.command == "prune":
+        print(f"Removed {cache.prune()} files")
+    elif args.command == "clear":
+        print(f"Removed {cache.clear()} files")
+
+    entries = cache.entries()
+    total = sum(size for _, size, _ in entries)
+    print(f"{cache.directory}: {len(entries)} files, {total / (1024 * 1024):.1f} MB "
+          f"(cap {cache.max_bytes / (1024 * 1024):.0f} MB)")
+    if args.command == "stats" and entries:
+        oldest = time.strftime("%Y-%m-%d %H:%M", time.localtime(entries[0][2]))
+        print(f"Least recently used entry: {oldest}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
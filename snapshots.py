@@ -0,0 +1,125 @@
+"""ID snapshots of the last reports per realm and monitoring type.
+
+Incremental mode compares a report with the one processed before it for the
+same realm and type, so that the daily AQL only covers the delta. Each
+``(realm, monitoring type)`` keeps two snapshots, ``latest`` and
+``previous``, in one JSON file. Recording a report whose content hash
+equals ``latest`` compares it with ``previous`` without rotating, so
+re-uploads and Streamlit reruns always see the same delta.
+
+Recording is a read-modify-write of that file. It runs under a lock file
+next to it (``fcntl.flock``), so the web app and batch runs in other
+processes cannot lose each other's updates; files are replaced atomically.
+"""
+
+import contextlib
+import datetime
+import json
+import os
+import tempfile
+import threading
+import urllib.parse
+from pathlib import Path
+from typing import Iterable, NamedTuple, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows; only threads are serialized there
+    fcntl = None
+
+SNAPSHOT_DIR = Path(os.environ.get("POM_SNAPSHOT_DIR", Path.home() / ".pom" / "snapshots"))
+
+
+class IdDelta(NamedTuple):
+    """How a report's IDs differ from the baseline report they were compared with."""
+
+    baseline_recorded_at: str
+    baseline_file_name: Optional[str]
+    added: list
+    removed: list
+    unchanged_count: int
+
+
+def compute_id_delta(previous: Iterable, current: list) -> tuple:
+    """Return ``(added, removed, unchanged_count)``; both lists keep their report order."""
+    previous = list(previous)
+    previous_set = set(previous)
+    current_set = set(current)
+    added = [name for name in current if name not in previous_set]
+    removed = [name for name in previous if name not in current_set]
+    return added, removed, len(current_set & previous_set)
+
+
+class SnapshotStore:
+    """Directory of per realm and type snapshot files with latest/previous rotation."""
+
+    def __init__(self, directory: Path = SNAPSHOT_DIR):
+        self.directory = Path(directory)
+        self._lock = threading.Lock()
+
+    def path(self, realm: str, monitoring_type: str) -> Path:
+        quote = lambda part: urllib.parse.quote(part, safe="")  # noqa: E731
+        return self.directory / f"{quote(realm)}.{quote(monitoring_type)}.json"
+
+    def load(self, realm: str, monitoring_type: str) -> dict:
+        """The stored ``{"latest": ..., "previous": ...}`` snapshots (empty when none)."""
+        try:
+            with open(self.path(realm, monitoring_type), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def record(self, realm: str, monitoring_type: str, content_hash: str, unique_names: list,
+               file_name: Optional[str] = None) -> Optional[IdDelta]:
+        """Compare a report with its predecessor and make it the latest snapshot.
+
+        Returns None when there is no earlier report for this realm and type.
+        """
+        with self._lock, self._file_lock(realm, monitoring_type):
+            snapshots = self.load(realm, monitoring_type)
+            latest = snapshots.get("latest")
+            if latest is not None and latest["content_hash"] == content_hash:
+                baseline = snapshots.get("previous")
+            else:
+                baseline = latest
+                snapshots = {
+                    "latest": {
+                        "content_hash": content_hash,
+                        "file_name": file_name,
+                        "recorded_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                        "unique_names": list(unique_names),
+                    },
+                    "previous": latest,
+                }
+                self._write(self.path(realm, monitoring_type), snapshots)
+
+        if baseline is None:
+            return None
+        added, removed, unchanged_count = compute_id_delta(baseline["unique_names"], unique_names)
+        return IdDelta(baseline["recorded_at"], baseline.get("file_name"), added, removed, unchanged_count)
+
+    @contextlib.contextmanager
+    def _file_lock(self, realm: str, monitoring_type: str):
+        """Hold an exclusive lock on the snapshot file of ``realm`` and type across processes."""
+        if fcntl is None:
+            yield
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.path(realm, monitoring_type).with_suffix(".lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _write(self, path: Path, snapshots: dict):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Replace atomically so a concurrent reader never sees half a file
+        fd, tmp_name = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(snapshots, f)
+            os.replace(tmp_name, path)
+        except OSError:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
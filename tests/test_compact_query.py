@@ -0,0 +1,92 @@
+"""Compacted queries must be valid AQL and select exactly the rows of the plain IN-list.
+
+The rendered query is parsed back into its IN-list and range predicates, and
+these are evaluated with AQL's semantics (text comparison and LIKE) against
+the queried IDs and look-alikes that satisfy the compaction's assumption:
+every ID of a prefix and length has only digits after the prefix.
+"""
+
+import random
+import re
+
+import pytest
+
+from processing import compact_query, render_query
+
+TEMPLATE = "SELECT UniqueName FROM ids WHERE UniqueName IN ({names})"
+
+RANGE_PREDICATE = re.compile(r"\(UniqueName >= '([^']*)' AND UniqueName <= '([^']*)' AND UniqueName LIKE '([^']*)'\)")
+IN_LIST = re.compile(r"UniqueName IN \(([^)]*)\)")
+
+
+def parse_predicates(query: str) -> tuple:
+    """The listed IDs and the ``(first, last, pattern)`` ranges of a rendered query."""
+    in_list = IN_LIST.search(query)
+    singles = set(re.findall(r"'([^']*)'", in_list.group(1))) if in_list else set()
+    return singles, RANGE_PREDICATE.findall(query)
+
+
+def like(value: str, pattern: str) -> bool:
+    regex = "".join("." if char == "_" else ".*" if char == "%" else re.escape(char) for char in pattern)
+    return re.fullmatch(regex, value, re.DOTALL) is not None
+
+
+def selects(query: str, value: str) -> bool:
+    singles, ranges = parse_predicates(query)
+    return value in singles or any(first <= value <= last and like(value, pattern) for first, last, pattern in ranges)
+
+
+def look_alikes(name: str, rng: random.Random) -> list:
+    """Digits-only neighbours of ``name``: other numbers, other widths and other prefixes."""
+    prefix, digits = re.fullmatch(r"(.*?)([0-9]+)", name).groups()
+    number = int(digits)
+    width = len(digits)
+    variants = [f"{prefix}{number + delta:0{width}d}" for delta in (-2, -1, 1, 2) if 0 <= number + delta < 10 ** width]
+    variants += [f"{prefix}{number:0{width + 1}d}", f"{prefix}{digits[1:]}", f"{prefix}{rng.randrange(10 ** width):0{width}d}"]
+    variants += [f"X{prefix}{digits}", f"{prefix[:-1]}{digits}", f"{prefix.lower()}{digits}"]
+    return variants
+
+
+def random_ids(rng: random.Random) -> list:
+    """IDs with runs of consecutive numbers, gaps and several prefixes and widths."""
+    ids = []
+    for _ in range(rng.randint(1, 6)):
+        prefix = rng.choice(["PO", "EP", "RC", "PO1", "P_", "PO%", ""])
+        width = rng.randint(2, 6)
+        start = rng.randrange(10 ** width)
+        for number in range(start, min(start + rng.randint(1, 40), 10 ** width)):
+            if rng.random() < 0.9:
+                ids.append(f"{prefix}{number:0{width}d}")
+    ids += [f"PO{rng.randrange(10 ** 5)}" for _ in range(rng.randint(0, 20))]
+    return ids
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_compacted_query_matches_in_list(seed):
+    rng = random.Random(seed)
+    ids = random_ids(rng)
+    candidates = set(ids)
+    for name in ids:
+        candidates.update(look_alikes(name, rng))
+
+    template, singles = compact_query(TEMPLATE, ids, min_run=rng.choice([2, 3, 8]))
+    query = render_query(template, singles)
+    assert {value for value in candidates if selects(query, value)} == set(ids)
+
+
+def test_compaction_renders_aql_operators():
+    ids = [f"PO{number:05d}" for number in range(100, 200)] + ["EP7"]
+    template, singles = compact_query(TEMPLATE, ids)
+    query = render_query(template, singles)
+    assert singles == ["EP7"]
+    assert "(UniqueName >= 'PO00100' AND UniqueName <= 'PO00199' AND UniqueName LIKE 'PO_____')" in query
+    # Nothing but the operators AQL has: no GLOB, regular expressions or functions
+    assert "GLOB" not in query and "REGEXP" not in query
+    assert RANGE_PREDICATE.sub("", IN_LIST.sub("", query.split("WHERE", 1)[1])).strip("()\nOR ") == ""
+
+
+def test_like_wildcards_in_prefix_stay_listed():
+    ids = [f"P_{number:03d}" for number in range(10, 30)] + [f"P%{number:03d}" for number in range(10, 30)]
+    template, singles = compact_query(TEMPLATE, ids)
+    assert template == TEMPLATE
+    assert sorted(singles) == sorted(ids)
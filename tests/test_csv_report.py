@@ -0,0 +1,95 @@
+"""Reading CSV/TSV exports: delimiters, gzip, type detection and text IDs."""
+
+import gzip
+import io
+
+import pytest
+
+from processing import (
+    CsvReport,
+    ParseProgress,
+    detect_type_from_header,
+    detect_type_from_name,
+    extract_unique_names_csv,
+    is_delimited_file,
+    open_report,
+    sniff_delimiter,
+)
+from sheet_cache import SheetCache
+
+PO_EXPORT = (
+    "UniqueName,OrderID,StatusString,Recipients.OrderingMethod\n"
+    "00123,1,Ordered,Email\n"
+    "PO2,2,Failed,cXML\n"
+    "00123,3,Ordered,\n"
+    ",4,Ordered,Email\n"
+)
+
+
+def report(text: str, file_name: str, tmp_path, compress: bool = False) -> CsvReport:
+    data = text.encode("utf-8")
+    return CsvReport(gzip.compress(data) if compress else data, file_name, sheet_cache=SheetCache(tmp_path, 10 ** 9))
+
+
+@pytest.mark.parametrize("header, file_name, expected", [
+    ("a,b,c", "x.csv", ","),
+    ("a;b;c", "x.csv", ";"),
+    ("a|b|c", "x.txt", "|"),
+    ("a\tb\tc", "x.csv", "\t"),
+    ("a,b;c", "x.tsv.gz", "\t"),
+    ("UniqueName", "x.csv", ","),
+])
+def test_sniff_delimiter(header, file_name, expected):
+    assert sniff_delimiter(header, file_name) == expected
+
+
+def test_detect_type():
+    assert detect_type_from_name("acme_PO-Ordering_2026-06.csv") == "PO_Ordering"
+    assert detect_type_from_name("rc processing.tsv") == "RC_Processing"
+    assert detect_type_from_name("export.csv") is None
+    assert detect_type_from_header(["UniqueName", "ApprovedDate"]) == "RC_Processing"
+    assert detect_type_from_header(["UniqueName", "OrderID"]) == "PO_Ordering"
+    assert detect_type_from_header(["UniqueName"]) is None
+
+
+def test_extract_keeps_ids_as_text_in_first_seen_order():
+    progress = ParseProgress()
+    unique_names = extract_unique_names_csv(io.StringIO(PO_EXPORT), chunk_rows=2, progress=progress)
+    assert unique_names == ["00123", "PO2"]
+    assert progress.rows_read == 4
+
+
+def test_extract_without_the_column_gives_none():
+    assert extract_unique_names_csv(io.StringIO("Other\n1\n")) is None
+
+
+@pytest.mark.parametrize("compress", [False, True])
+@pytest.mark.parametrize("sep", [",", ";", "\t"])
+def test_report_reads_any_delimiter_and_gzip(tmp_path, compress, sep):
+    workbook = report(PO_EXPORT.replace(",", sep), "export.csv" + (".gz" if compress else ""), tmp_path, compress)
+    assert workbook.monitoring_type == "PO_Ordering"
+    assert workbook.columns == ["UniqueName", "OrderID", "StatusString", "Recipients.OrderingMethod"]
+    assert workbook.unique_names == ["00123", "PO2"]
+    assert workbook.query_ids == ["00123", "PO2"]
+    assert workbook.df_data["UniqueName"].dropna().tolist() == ["00123", "PO2", "00123"]
+    assert workbook.summary["Status"].to_dict() == {"Ordered": 3, "Failed": 1}
+
+
+def test_report_type_comes_from_the_name_first(tmp_path):
+    workbook = report("UniqueName,ApprovedDate\nPO1,2026-01-01\n", "acme_PO_Ordering.csv", tmp_path)
+    assert workbook.monitoring_type == "PO_Ordering"
+    assert workbook.data_sheet == "PO_Ordering"
+    assert workbook.info == {}
+
+
+def test_byte_order_mark_is_ignored(tmp_path):
+    workbook = CsvReport("\ufeffUniqueName\nPO1\n".encode("utf-8"), "po_ordering.csv",
+                         sheet_cache=SheetCache(tmp_path, 10 ** 9))
+    assert workbook.columns == ["UniqueName"]
+    assert workbook.unique_names == ["PO1"]
+
+
+def test_open_report_picks_the_reader_by_name():
+    assert isinstance(open_report(PO_EXPORT.encode(), "export.csv.gz"), CsvReport)
+    assert isinstance(open_report(PO_EXPORT.encode(), "EXPORT.TSV"), CsvReport)
+    assert not is_delimited_file("report.xlsx")
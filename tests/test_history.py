@@ -0,0 +1,75 @@
+"""Report history across runs: ID snapshots for incremental mode and the SQLite ID history."""
+
+import pytest
+
+from id_history import IdHistory
+from snapshots import SnapshotStore, compute_id_delta
+
+
+@pytest.fixture
+def store(tmp_path) -> SnapshotStore:
+    return SnapshotStore(tmp_path / "snapshots")
+
+
+@pytest.fixture
+def history(tmp_path) -> IdHistory:
+    return IdHistory(tmp_path / "history.sqlite3")
+
+
+def test_compute_id_delta_keeps_report_order():
+    assert compute_id_delta(["PO3", "PO1", "PO2"], ["PO4", "PO2", "PO5", "PO1"]) == (["PO4", "PO5"], ["PO3"], 2)
+
+
+def test_first_report_has_no_delta(store):
+    assert store.record("acme", "PO_Ordering", "h1", ["PO1", "PO2"], "day1.xlsx") is None
+    assert store.load("acme", "PO_Ordering")["latest"]["unique_names"] == ["PO1", "PO2"]
+
+
+def test_delta_against_the_previous_report(store):
+    store.record("acme", "PO_Ordering", "h1", ["PO1", "PO2"], "day1.xlsx")
+    delta = store.record("acme", "PO_Ordering", "h2", ["PO2", "PO3"], "day2.xlsx")
+    assert (delta.added, delta.removed, delta.unchanged_count) == (["PO3"], ["PO1"], 1)
+    assert delta.baseline_file_name == "day1.xlsx"
+
+
+def test_recording_the_latest_again_does_not_rotate(store):
+    store.record("acme", "PO_Ordering", "h1", ["PO1"])
+    first = store.record("acme", "PO_Ordering", "h2", ["PO1", "PO2"])
+    again = store.record("acme", "PO_Ordering", "h2", ["PO1", "PO2"])
+    assert again == first
+    assert store.load("acme", "PO_Ordering")["previous"]["content_hash"] == "h1"
+
+
+def test_snapshots_are_kept_per_realm_and_type(store):
+    store.record("acme", "PO_Ordering", "h1", ["PO1"])
+    assert store.record("beta", "PO_Ordering", "h2", ["PO2"]) is None
+    assert store.record("acme", "RC_Processing", "h3", ["RC1"]) is None
+    assert store.record("a/b", "PO_Ordering", "h4", ["PO1"]) is None
+    assert store.path("a/b", "PO_Ordering").parent == store.directory
+
+
+def test_recurring_ids_are_counted_per_realm_and_type(history):
+    assert history.record("acme", "PO_Ordering", "h1", ["PO1", "PO2", "PO2"], "day1.xlsx") == 0
+    assert history.record("acme", "PO_Ordering", "h2", ["PO2", "PO3", "PO1"], "day2.xlsx") == 2
+    assert history.record("beta", "PO_Ordering", "h3", ["PO1"]) == 0
+    assert history.record("acme", "RC_Processing", "h4", ["PO1"]) == 0
+
+
+def test_recording_the_same_report_again_is_a_no_op(history):
+    history.record("acme", "PO_Ordering", "h1", ["PO1"])
+    assert history.record("acme", "PO_Ordering", "h2", ["PO1", "PO2"]) == 1
+    assert history.record("acme", "PO_Ordering", "h2", ["PO1", "PO2"]) == 1
+    assert history.lookup("acme", "PO_Ordering", "PO1")["report_count"] == 2
+
+
+def test_lookup_and_chronic_ids(history):
+    history.record(None, "PO_Ordering", "h1", ["PO1", "PO2"])
+    history.record("", "PO_Ordering", "h2", ["PO1"])
+    assert history.lookup("", "PO_Ordering", "PO9") is None
+    assert history.lookup(None, "PO_Ordering", "PO2")["report_count"] == 1
+    assert [row["unique_name"] for row in history.chronic_ids("", "PO_Ordering")] == ["PO1"]
+
+
+def test_history_survives_a_new_handle(tmp_path, history):
+    history.record("acme", "PO_Ordering", "h1", ["PO1"])
+    assert IdHistory(tmp_path / "history.sqlite3").record("acme", "PO_Ordering", "h2", ["PO1"]) == 1
@@ -0,0 +1,53 @@
+"""Release and restore of the raw upload held by a LazyWorkbook."""
+
+import io
+
+import openpyxl
+import pytest
+
+from processing import LazyWorkbook
+from sheet_cache import SheetCache
+
+
+@pytest.fixture
+def report_bytes() -> bytes:
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "PO_Ordering"
+    ws.append(["UniqueName", "StatusString"])
+    for number in range(5):
+        ws.append([f"PO{number}", "Ordered"])
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+def parsed(workbook: LazyWorkbook) -> LazyWorkbook:
+    workbook.columns, workbook.info, workbook.unique_names
+    return workbook
+
+
+def test_released_upload_is_read_back_from_the_cache(tmp_path, report_bytes):
+    workbook = parsed(LazyWorkbook(report_bytes, sheet_cache=SheetCache(tmp_path, 10 ** 9)))
+    assert workbook.release_file_bytes()
+    assert workbook.memory_usage()["file"] == 0
+    assert len(workbook.df_data) == 5
+
+
+def test_pruned_upload_is_restored_by_a_new_upload(tmp_path, report_bytes):
+    cache = SheetCache(tmp_path, 10 ** 9)
+    workbook = parsed(LazyWorkbook(report_bytes, sheet_cache=cache))
+    assert workbook.release_file_bytes()
+    cache.prune(0)
+    with pytest.raises(RuntimeError):
+        workbook.df_data
+    workbook.restore_file_bytes(report_bytes)
+    assert len(workbook.df_data) == 5
+
+
+def test_upload_is_kept_without_a_cache(report_bytes):
+    workbook = LazyWorkbook(report_bytes)
+    workbook.sheet_cache = None
+    parsed(workbook)
+    assert not workbook.release_file_bytes()
+    assert workbook.memory_usage()["file"] == len(report_bytes)
@@ -0,0 +1,63 @@
+"""Canonical form, escaping and rejection reasons of ``normalize_unique_names``."""
+
+import numpy as np
+import pytest
+
+from processing import normalize_unique_names
+
+
+@pytest.mark.parametrize("value", [None, np.nan, "", "   ", "''", '" "'])
+def test_missing_values_are_rejected_as_empty(value):
+    ids, rejected = normalize_unique_names(["PO1", value], "PO_Ordering")
+    assert ids == ["PO1"]
+    assert rejected["Reason"].tolist() == ["empty"]
+    assert rejected["Normalized"].tolist() == [""]
+    assert rejected["UniqueName"].iloc[0] not in ("None", "nan")
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("PO123.0", "PO123"),
+    (123.0, "123"),
+    ("PO123.00", "PO123"),
+    (" po7 ", "PO7"),
+    ("PO9-v2", "PO9-V2"),
+])
+def test_ids_are_canonicalized(value, expected):
+    assert normalize_unique_names([value], "PO_Ordering")[0] == [expected]
+
+
+@pytest.mark.parametrize("value", ["'PO8'", '"PO8"', "`PO8`", "‘PO8’", "“PO8”", " ' PO8 ' "])
+def test_surrounding_quotes_are_stripped(value):
+    assert normalize_unique_names([value], "PO_Ordering")[0] == ["PO8"]
+
+
+def test_inner_quotes_are_escaped_for_aql():
+    ids, rejected = normalize_unique_names(["O'Brien", "'Smith'"])
+    assert ids == ["O''BRIEN", "SMITH"]
+    assert rejected.empty
+
+
+def test_ids_are_deduped_after_canonicalization():
+    ids, _ = normalize_unique_names(["PO1", "po1", " PO1.0 ", "PO2", "'PO1'"], "PO_Ordering")
+    assert ids == ["PO1", "PO2"]
+
+
+def test_rejection_reasons_and_values():
+    ids, rejected = normalize_unique_names(["PO1", "PO-X", None, "PO 2", "PO3"], "PO_Ordering")
+    assert ids == ["PO1", "PO3"]
+    assert rejected.columns.tolist() == ["UniqueName", "Normalized", "Reason"]
+    assert rejected.to_dict("records") == [
+        {"UniqueName": "PO-X", "Normalized": "PO-X", "Reason": "invalid format"},
+        {"UniqueName": "", "Normalized": "", "Reason": "empty"},
+        {"UniqueName": "PO 2", "Normalized": "PO 2", "Reason": "invalid format"},
+    ]
+
+
+def test_patterns_depend_on_the_monitoring_type():
+    # Version suffixes are only valid PO_Ordering IDs
+    assert normalize_unique_names(["PO9-V2"], "PO_Ordering")[0] == ["PO9-V2"]
+    assert normalize_unique_names(["PO9-V2"], "RC_Processing")[1]["Reason"].tolist() == ["invalid format"]
+    # Other types take any text without control characters
+    ids, rejected = normalize_unique_names(["any id/1", "bad\x01id"], "Other")
+    assert ids == ["ANY ID/1"]
+    assert rejected["Reason"].tolist() == ["invalid format"]
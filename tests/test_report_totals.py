@@ -0,0 +1,119 @@
+"""Realm split and Summary breakdowns, in one frame and folded from chunks.
+
+``ScanTotals`` builds both while the ID pass streams the sheet, so its
+results must equal ``split_ids_by_realm`` and ``summarize_report`` on the
+whole frame however the rows are chunked.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from processing import (
+    AGE_TITLE,
+    BLANK_LABEL,
+    REALM_COLUMN,
+    ScanTotals,
+    bucket_ages,
+    split_ids_by_realm,
+    summarize_report,
+)
+
+NOW = pd.Timestamp("2026-06-15 12:00")
+
+
+@pytest.fixture
+def po_rows() -> pd.DataFrame:
+    return pd.DataFrame({
+        "UniqueName": ["PO1", "PO2", "po1", "PO3", None, "PO4", "PO-X", "PO5"],
+        REALM_COLUMN: ["acme", "acme", "acme", "beta", "beta", None, "beta", " acme "],
+        "StatusString": ["Ordered", "Failed", "Ordered", "Ordered", None, "Failed", "Ordered", "Ordered"],
+        "Recipients.OrderingMethod": ["Email", "cXML", "Email", None, "Email", "Email", "cXML", "Email"],
+        "Recipients.FailureReason": [None, "Timeout", None, None, None, "Rejected", None, None],
+        "Supplier.Name": ["S1", "S2", "S1", "S3", "S3", "S2", "S1", "S1"],
+    })
+
+
+@pytest.fixture
+def rc_rows() -> pd.DataFrame:
+    return pd.DataFrame({
+        "UniqueName": ["RC1", "RC2", "RC3", "RC4", "RC5", "RC6"],
+        "StatusString": ["Approved"] * 6,
+        "ApprovedDate": [NOW - pd.Timedelta(hours=2), None, NOW - pd.Timedelta(days=5), None, NOW, None],
+        "CreateDate": [NOW, NOW - pd.Timedelta(days=2), NOW, None, NOW - pd.Timedelta(days=40), "not a date"],
+    })
+
+
+def as_dicts(summary: dict) -> dict:
+    return {title: counts.to_dict() for title, counts in summary.items()}
+
+
+def folded(df: pd.DataFrame, monitoring_type: str, chunk_rows: int) -> ScanTotals:
+    totals = ScanTotals(monitoring_type)
+    for start in range(0, len(df), chunk_rows):
+        totals.add(df.iloc[start:start + chunk_rows])
+    return totals
+
+
+def test_realm_split(po_rows):
+    realm_ids = split_ids_by_realm(po_rows["UniqueName"], po_rows[REALM_COLUMN], "PO_Ordering", default_realm="acme")
+    # Realm names are stripped; rows without one join the default realm; invalid IDs are dropped
+    assert realm_ids == {"acme": ["PO1", "PO2", "PO5", "PO4"], "beta": ["PO3"]}
+
+
+def test_realm_split_drops_realms_without_valid_ids():
+    realm_ids = split_ids_by_realm(pd.Series(["PO1", "PO-X", None]), pd.Series(["acme", "beta", "gamma"]), "PO_Ordering")
+    assert realm_ids == {"acme": ["PO1"]}
+
+
+def test_rows_without_realm_keep_a_blank_realm_by_default():
+    realm_ids = split_ids_by_realm(pd.Series(["PO1", "PO2"]), pd.Series(["acme", np.nan]), "PO_Ordering")
+    assert realm_ids == {"acme": ["PO1"], "": ["PO2"]}
+
+
+def test_po_summary(po_rows):
+    summary = summarize_report(po_rows, "PO_Ordering")
+    assert list(summary) == ["Status", "Ordering Method", "Failure Reason", "Supplier"]
+    assert summary["Status"].to_dict() == {"Ordered": 5, "Failed": 2, BLANK_LABEL: 1}
+    assert summary["Status"].index.tolist() == ["Ordered", "Failed", BLANK_LABEL]
+    assert summary["Failure Reason"].to_dict() == {BLANK_LABEL: 6, "Timeout": 1, "Rejected": 1}
+    assert summary["Ordering Method"].sum() == len(po_rows)
+
+
+def test_summary_skips_missing_columns():
+    summary = summarize_report(pd.DataFrame({"UniqueName": ["PO1"], "StatusString": ["Ordered"]}), "PO_Ordering")
+    assert as_dicts(summary) == {"Status": {"Ordered": 1}}
+    assert summarize_report(pd.DataFrame({"UniqueName": ["PO1"]}), "PO_Ordering") == {}
+    assert summarize_report(pd.DataFrame({"StatusString": []}), "PO_Ordering") == {}
+
+
+def test_age_buckets(rc_rows):
+    summary = summarize_report(rc_rows, "RC_Processing", now=NOW)
+    # The ApprovedDate wins, CreateDate fills in where it is missing, and
+    # buckets stay in age order with the blank ones last
+    assert summary[AGE_TITLE].index.tolist() == ["< 1 day", "1-3 days", "3-7 days", BLANK_LABEL]
+    assert summary[AGE_TITLE].tolist() == [2, 1, 1, 2]
+
+
+def test_future_dates_count_as_new():
+    assert bucket_ages(pd.Series([NOW + pd.Timedelta(days=3)]), NOW).tolist() == ["< 1 day"]
+
+
+@pytest.mark.parametrize("chunk_rows", [1, 3, 100])
+def test_totals_match_the_whole_frame(po_rows, rc_rows, chunk_rows):
+    po_totals = folded(po_rows, "PO_Ordering", chunk_rows)
+    assert po_totals.realm_ids("acme") == split_ids_by_realm(
+        po_rows["UniqueName"], po_rows[REALM_COLUMN], "PO_Ordering", "acme"
+    )
+    assert as_dicts(po_totals.summary()) == as_dicts(summarize_report(po_rows, "PO_Ordering"))
+    rc_totals = folded(rc_rows, "RC_Processing", chunk_rows)
+    assert as_dicts(rc_totals.summary(NOW)) == as_dicts(summarize_report(rc_rows, "RC_Processing", now=NOW))
+    assert rc_totals.summary(NOW)[AGE_TITLE].index.tolist() == ["< 1 day", "1-3 days", "3-7 days", BLANK_LABEL]
+
+
+def test_totals_round_trip_through_a_frame(po_rows, rc_rows):
+    for df, monitoring_type in [(po_rows, "PO_Ordering"), (rc_rows, "RC_Processing")]:
+        totals = folded(df, monitoring_type, 2)
+        restored = ScanTotals.from_frame(totals.to_frame(), monitoring_type)
+        assert restored.realm_ids("acme") == totals.realm_ids("acme")
+        assert as_dicts(restored.summary(NOW)) == as_dicts(totals.summary(NOW))
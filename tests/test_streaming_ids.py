@@ -0,0 +1,77 @@
+"""The streamed ID column must equal what pandas reads from the same sheet.
+
+Each case writes one column to a workbook with openpyxl and compares
+``extract_unique_names_streaming`` with
+``pd.read_excel(...)[column].dropna().unique().tolist()``.
+"""
+
+import datetime
+import io
+
+import openpyxl
+import pandas as pd
+import pytest
+
+import processing
+from processing import LazyWorkbook, extract_unique_names_streaming
+
+CASES = {
+    "text": ["PO1", "PO2", "PO1", " PO3 ", "00123", "po2"],
+    "na_markers": ["PO1", None, "NA", "n/a", "", "NULL", "#N/A", "PO2", "nan", "PO1"],
+    "integers": [10, 20, 10, 30],
+    "integers_with_gaps": [10, None, 20, 10],
+    "fractions": [1.5, 2, 2.0, 3],
+    "integral_floats": [1.0, 2.0, 1.0],
+    "mixed": ["PO1", 123, 123.0, "123", None, 45.5],
+    "dates": [datetime.datetime(2026, 1, 1), datetime.datetime(2026, 1, 2), datetime.datetime(2026, 1, 1)],
+    "booleans": [True, False, True],
+}
+
+
+def workbook_bytes(values: list, sheet_name: str = "PO_Ordering") -> bytes:
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = sheet_name
+    ws.append(["Other", "UniqueName"])
+    for value in values:
+        ws.append(["x", value])
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize("values", CASES.values(), ids=CASES.keys())
+def test_streaming_matches_read_excel(values):
+    data = workbook_bytes(values)
+    expected = pd.read_excel(io.BytesIO(data), sheet_name="PO_Ordering", engine="openpyxl")["UniqueName"]
+    streamed = extract_unique_names_streaming(io.BytesIO(data), "PO_Ordering")
+    assert streamed == expected.dropna().unique().tolist()
+
+
+def test_missing_column_gives_none():
+    assert extract_unique_names_streaming(io.BytesIO(workbook_bytes(["PO1"])), "PO_Ordering", column="Missing") is None
+
+
+def test_row_columns_are_handed_on_in_chunks(monkeypatch):
+    monkeypatch.setattr(processing, "SCAN_CHUNK_ROWS", 3)
+    values = [f"PO{number}" for number in range(10)]
+    chunks = []
+    extract_unique_names_streaming(
+        io.BytesIO(workbook_bytes(values)), "PO_Ordering", row_columns=["UniqueName", "Other"], on_rows=chunks.append
+    )
+    assert [len(chunk) for chunk in chunks] == [3, 3, 3, 1]
+    assert pd.concat(chunks)["UniqueName"].tolist() == values
+
+
+@pytest.mark.parametrize("engine", ["auto", "openpyxl"])
+def test_id_pass_streams_unless_calamine_is_chosen(monkeypatch, engine):
+    monkeypatch.setattr(processing, "EXCEL_ENGINE", engine)
+    calls = []
+    monkeypatch.setattr(
+        processing, "extract_unique_names_streaming",
+        lambda *args, **kwargs: calls.append(args) or extract_unique_names_streaming(*args, **kwargs),
+    )
+    workbook = LazyWorkbook(workbook_bytes(["PO1", "PO2", "PO1"]), sheet_cache=None)
+    workbook.sheet_cache = None
+    assert workbook.unique_names == ["PO1", "PO2"]
+    assert len(calls) == 1